@@ -1,31 +1,50 @@
 """Database connection and session management for PostgreSQL."""
 
 import logging
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
+from uuid import uuid4
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel
 
 from app.config import settings
 
+# Importing the models registers their tables on SQLModel.metadata
+from app.db_models import AnalyzedTransaction  # noqa: F401
+
 logger = logging.getLogger(__name__)
 
+# PgBouncer in transaction mode hands each transaction to any server connection, so
+# prepared statements cached on one connection may be missing (or clash by name) on the
+# next; disable both caches and give every statement a unique name
+connect_args: Dict[str, Any] = (
+    {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+    if settings.database_pgbouncer
+    else {}
+)
+
 # Create async engine
 engine = create_async_engine(
     settings.database_url,
     echo=settings.database_echo,
     pool_size=settings.database_pool_size,
     max_overflow=settings.database_max_overflow,
-    pool_pre_ping=True,  # Verify connections before using
+    pool_timeout=settings.database_pool_timeout,
+    pool_recycle=settings.database_pool_recycle,
+    # A per-checkout SELECT 1 costs a round-trip on every request; stale connections are
+    # handled by pool_recycle, so only ping in debug where the database comes and goes
+    pool_pre_ping=settings.debug,
+    connect_args=connect_args,
 )
 
 # Create async session factory
-AsyncSessionLocal = sessionmaker(
+AsyncSessionLocal = async_sessionmaker(
     engine,
-    class_=AsyncSession,
     expire_on_commit=False,
-    autocommit=False,
     autoflush=False,
 )
 
@@ -41,25 +60,26 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     Yields:
         AsyncSession: Database session
     """
+    # Exiting the context manager closes the session
     async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+        yield session
 
 
 async def init_db() -> None:
     """
     Initialize database by creating all tables.
 
-    This should be called on application startup.
+    This should be called on application startup. Table creation only runs in debug
+    mode or when database_create_tables_on_startup is set, so production workers
+    don't repeat the schema inspection on every start.
     """
+    if not (settings.debug or settings.database_create_tables_on_startup):
+        logger.info("Skipping table creation on startup")
+        return
+
     try:
         logger.info("Initializing database...")
         async with engine.begin() as conn:
-            # Import all models to ensure they're registered with SQLModel
-            from app.db_models import AnalyzedTransaction  # noqa: F401
-
             # Create all tables
             await conn.run_sync(SQLModel.metadata.create_all)
 
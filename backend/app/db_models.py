@@ -1,9 +1,12 @@
 """Database models for storing analyzed transactions."""
 
+import os
+import time
 import uuid
 from datetime import datetime, timezone
 from decimal import Decimal
 
+from sqlalchemy import Index, desc, text
 from sqlmodel import Field, SQLModel, Column, JSON
 
 from typing import Optional
@@ -14,6 +17,25 @@ from decimal import Decimal
 from typing import Optional
 
 
+def uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered UUID (version 7, RFC 9562).
+
+    The leading 48 bits are the Unix timestamp in milliseconds, so new primary keys
+    land at the right edge of the B-tree instead of on random leaf pages.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (
+        (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76  # version
+        | ((rand >> 62) & 0xFFF) << 64
+        | 0b10 << 62  # RFC 4122 variant
+        | rand & 0x3FFF_FFFF_FFFF_FFFF
+    )
+    return uuid.UUID(int=value)
+
+
 class RawTransaction(SQLModel, table=True):
     """The original Sparkov data (The Audit Table)."""
 
@@ -36,6 +58,10 @@ class EngineeredTransaction(SQLModel, table=True):
     """The 'Model-Ready' data used for inference (The Feature Store)."""
 
     __tablename__ = "engineered_transactions"
+    __table_args__ = (
+        # Small partial index backing the 'fraud' sample scenario
+        Index("ix_eng_fraud_only", "trans_num", postgresql_where=text("is_fraud = 1")),
+    )
 
     # Primary key - no auto-incrementing id in this table
     trans_num: str = Field(primary_key=True, index=True)
@@ -78,12 +104,15 @@ class AnalyzedTransaction(SQLModel, table=True):
     """
 
     __tablename__ = "analyzed_transactions"
+    __table_args__ = (
+        # Serves classification-filtered "most recent first" queries with an index range scan
+        Index("ix_analyzed_class_created", "classification", desc("created_at")),
+    )
 
     # Primary key
     id: uuid.UUID = Field(
-        default_factory=uuid.uuid4,
+        default_factory=uuid7,
         primary_key=True,
-        index=True,
         nullable=False,
     )
 
@@ -123,7 +152,6 @@ class AnalyzedTransaction(SQLModel, table=True):
 
     # Fraud analysis results
     classification: str = Field(
-        index=True,
         nullable=False,
         max_length=50,
         description="Fraud classification: fraudulent, suspicious, legitimate, unknown",
@@ -1,22 +1,80 @@
 """Service layer for database operations on analyzed transactions."""
 
+import asyncio
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Optional
+from typing import TYPE_CHECKING, Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import func, insert, select, tablesample
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from app.db_models import AnalyzedTransaction
-from app.models import FraudAnalysis
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.db_models import AnalyzedTransaction, EngineeredTransaction
+
+if TYPE_CHECKING:
+    from app.models import FraudAnalysis
 
 logger = logging.getLogger(__name__)
 
+# How many times more rows TABLESAMPLE should select than the requested limit, so the
+# sample still fills the LIMIT after the scenario filter is applied
+SAMPLE_OVERSAMPLE_FACTOR = 10
+
+# Row counts per sample scenario, refreshed by get_database_stats (and seeded by the
+# first get_sample_transactions call) and used to size the TABLESAMPLE percentage
+_scenario_row_counts: dict[str, int] = {}
+
+# Shared default for missing or zero amounts (Decimal is immutable, so one instance is safe)
+_ZERO = Decimal(0)
+
+# Stale-while-revalidate cache for get_database_stats
+_stats_cache: dict = {"value": None, "expires_at": 0.0, "refreshing": False}
+_stats_lock = asyncio.Lock()
+
+# Caps analysis saves running after their responses were sent, so bursts of requests
+# leave pooled connections for the endpoints that read the database
+_background_save_slots = asyncio.Semaphore(settings.database_background_writers)
+
+# Strong references to in-flight background refresh tasks
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _parse_timestamp(value, now: Optional[datetime] = None) -> datetime:
+    """
+    Convert a transaction timestamp to a datetime.
+
+    Args:
+        value: ISO 8601 string, datetime, or None
+        now: Fallback used when value is None (defaults to the current UTC time)
+
+    Returns:
+        Parsed datetime
+    """
+    if value is None:
+        return now or datetime.now(timezone.utc)
+    if isinstance(value, datetime):
+        return value
+    # Python 3.11+ accepts a trailing "Z" directly
+    return datetime.fromisoformat(value)
+
+
+def _to_decimal(value) -> Decimal:
+    """Convert a transaction amount to Decimal, skipping str() for exact numeric types."""
+    if value in (None, 0, "0"):
+        return _ZERO
+    if isinstance(value, (int, Decimal)):
+        return Decimal(value)
+    # Floats go through str() so Decimal gets the shortest repr, not the binary expansion
+    return Decimal(str(value))
+
 
 async def save_analysis(
     session: AsyncSession,
-    analysis: FraudAnalysis,
+    analysis: "FraudAnalysis",
     transaction_data: dict,
     model_version: str,
 ) -> Optional[AnalyzedTransaction]:
@@ -33,20 +91,13 @@ async def save_analysis(
         AnalyzedTransaction if saved successfully, None otherwise
     """
     try:
-        # Extract transaction timestamp
-        timestamp_str = transaction_data.get("timestamp", datetime.utcnow().isoformat())
-        if isinstance(timestamp_str, str):
-            timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-        else:
-            timestamp = timestamp_str
-
         # Create database record
         db_record = AnalyzedTransaction(
             transaction_id=analysis.transaction_id,
-            timestamp=timestamp,
+            timestamp=_parse_timestamp(transaction_data.get("timestamp")),
             merchant_name=transaction_data.get("merchant_name", "Unknown"),
             merchant_category=transaction_data.get("merchant_category", "unknown"),
-            amount=Decimal(str(transaction_data.get("amount", 0))),
+            amount=_to_decimal(transaction_data.get("amount")),
             classification=analysis.classification.value,
             risk_score=analysis.risk_score,
             risk_factors=analysis.risk_factors,
@@ -54,9 +105,10 @@ async def save_analysis(
             model_version=model_version,
         )
 
+        # id and created_at come from Python-side defaults and sessions are created with
+        # expire_on_commit=False, so no refresh round-trip is needed after commit
         session.add(db_record)
         await session.commit()
-        await session.refresh(db_record)
 
         logger.debug(
             f"Saved analysis for transaction {analysis.transaction_id} "
@@ -76,7 +128,7 @@ async def save_analysis(
 
 async def save_batch_analyses(
     session: AsyncSession,
-    analyses: list[FraudAnalysis],
+    analyses: list["FraudAnalysis"],
     transactions_data: list[dict],
     model_version: str,
 ) -> int:
@@ -92,44 +144,44 @@ async def save_batch_analyses(
     Returns:
         Number of successfully saved records
     """
-    try:
-        if len(analyses) != len(transactions_data):
-            logger.warning(
-                f"Mismatch between analyses ({len(analyses)}) "
-                f"and transactions ({len(transactions_data)})"
-            )
-            return 0
+    # Nothing to write; an empty parameter list would also make the INSERT run as a bare row
+    if not analyses and not transactions_data:
+        return 0
+
+    if len(analyses) != len(transactions_data):
+        logger.warning(
+            f"Mismatch between analyses ({len(analyses)}) "
+            f"and transactions ({len(transactions_data)})"
+        )
+        return 0
+
+    now = datetime.now(timezone.utc)
 
-        saved_count = 0
-
-        for analysis, transaction_data in zip(analyses, transactions_data):
-            # Extract transaction timestamp
-            timestamp_str = transaction_data.get("timestamp", datetime.utcnow().isoformat())
-            if isinstance(timestamp_str, str):
-                timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-            else:
-                timestamp = timestamp_str
-
-            # Create database record
-            db_record = AnalyzedTransaction(
-                transaction_id=analysis.transaction_id,
-                timestamp=timestamp,
-                merchant_name=transaction_data.get("merchant_name", "Unknown"),
-                merchant_category=transaction_data.get("merchant_category", "unknown"),
-                amount=Decimal(str(transaction_data.get("amount", 0))),
-                classification=analysis.classification.value,
-                risk_score=analysis.risk_score,
-                risk_factors=analysis.risk_factors,
-                explanation=analysis.explanation,
-                model_version=model_version,
-            )
-
-            session.add(db_record)
-            saved_count += 1
+    try:
+        # Build plain row dicts and issue a single Core INSERT (executemany) instead
+        # of routing every record through the ORM unit-of-work
+        rows = [
+            {
+                "transaction_id": analysis.transaction_id,
+                "timestamp": _parse_timestamp(transaction_data.get("timestamp"), now),
+                "merchant_name": transaction_data.get("merchant_name", "Unknown"),
+                "merchant_category": transaction_data.get("merchant_category", "unknown"),
+                "amount": _to_decimal(transaction_data.get("amount")),
+                "classification": analysis.classification.value,
+                "risk_score": analysis.risk_score,
+                "risk_factors": analysis.risk_factors,
+                "explanation": analysis.explanation,
+                "model_version": model_version,
+            }
+            for analysis, transaction_data in zip(analyses, transactions_data)
+        ]
 
         # Commit all records in a single transaction
+        await session.execute(insert(AnalyzedTransaction), rows)
         await session.commit()
 
+        saved_count = len(rows)
+
         logger.info(f"✅ Saved {saved_count} transaction analyses to database")
 
         return saved_count
@@ -140,6 +192,33 @@ async def save_batch_analyses(
         return 0
 
 
+async def save_batch_analyses_in_background(
+    analyses: list["FraudAnalysis"],
+    transactions_data: list,
+    model_version: str,
+) -> int:
+    """
+    Save analyses with a session of their own, for use after the response is sent.
+
+    Args:
+        analyses: List of FraudAnalysis objects
+        transactions_data: List of original transaction data dictionaries
+        model_version: Version of the model used for analysis
+
+    Returns:
+        Number of successfully saved records
+    """
+    async with _background_save_slots:
+        try:
+            async with AsyncSessionLocal() as session:
+                return await save_batch_analyses(
+                    session, analyses, transactions_data, model_version
+                )
+        except Exception as e:
+            logger.error(f"Background save of analyses failed: {str(e)}", exc_info=True)
+            return 0
+
+
 async def get_analysis_by_transaction_id(
     session: AsyncSession,
     transaction_id: str,
@@ -194,18 +273,61 @@ async def get_recent_analyses(
 
         statement = statement.order_by(AnalyzedTransaction.created_at.desc()).limit(limit)
 
-        result = await session.execute(statement)
-        return list(result.scalars().all())
+        return (await session.scalars(statement)).all()
 
     except Exception as e:
         logger.error(f"Failed to retrieve recent analyses: {str(e)}", exc_info=True)
         return []
 
 
+def _sample_statement(
+    scenario: str,
+    limit: int,
+    sample_percent: Optional[float] = None,
+    columns: Optional[Sequence[str]] = None,
+):
+    """
+    Build the random-sample query over engineered_transactions.
+
+    Args:
+        scenario: Filter scenario - 'fraud', 'legit', or 'mixed'
+        limit: Maximum number of rows to select
+        sample_percent: Optional TABLESAMPLE BERNOULLI percentage
+        columns: Optional column names to select instead of whole ORM entities
+
+    Returns:
+        SQLAlchemy select statement
+    """
+    # When we know how large the table is, TABLESAMPLE BERNOULLI keeps each row with
+    # probability p, so only the sampled rows get sorted by random()
+    source = EngineeredTransaction
+    if sample_percent is not None:
+        source = aliased(
+            EngineeredTransaction,
+            tablesample(EngineeredTransaction.__table__, func.bernoulli(sample_percent)),
+        )
+
+    if columns is None:
+        statement = select(source)
+    else:
+        statement = select(*(getattr(source, name) for name in columns))
+
+    # Apply scenario filter
+    if scenario == "fraud":
+        statement = statement.where(source.is_fraud == 1)
+    elif scenario == "legit":
+        statement = statement.where(source.is_fraud == 0)
+    # 'mixed' scenario has no filter
+
+    # Add random ordering and limit
+    return statement.order_by(func.random()).limit(limit)
+
+
 async def get_sample_transactions(
     session: AsyncSession,
     scenario: str,
     limit: int = 5,
+    columns: Optional[Sequence[str]] = None,
 ) -> list:
     """
     Retrieve random sample transactions from engineered_transactions table.
@@ -214,29 +336,36 @@ async def get_sample_transactions(
         session: Async database session
         scenario: Filter scenario - 'fraud', 'legit', or 'mixed'
         limit: Maximum number of records to return (default 5, max 100)
+        columns: Optional column names; when given, plain rows of just those columns
+            are returned, skipping ORM instance loading
 
     Returns:
-        List of EngineeredTransaction records
+        List of EngineeredTransaction records, or rows of the requested columns
     """
     try:
-        from app.db_models import EngineeredTransaction
-        from sqlalchemy import func
-
-        # Build base query
-        statement = select(EngineeredTransaction)
-
-        # Apply scenario filter
-        if scenario == "fraud":
-            statement = statement.where(EngineeredTransaction.is_fraud == 1)
-        elif scenario == "legit":
-            statement = statement.where(EngineeredTransaction.is_fraud == 0)
-        # 'mixed' scenario has no filter
-
-        # Add random ordering and limit
-        statement = statement.order_by(func.random()).limit(min(limit, 100))
-
-        result = await session.execute(statement)
-        transactions = list(result.scalars().all())
+        limit = min(limit, 100)
+
+        fetch = session.scalars if columns is None else session.execute
+        transactions = []
+
+        # Seed the row counts once so sampling works before anyone calls /api/stats
+        if not _scenario_row_counts:
+            try:
+                await _query_database_stats(session)
+            except Exception as e:
+                logger.warning(f"Could not count rows for sampling: {str(e)}")
+        population = _scenario_row_counts.get(scenario)
+
+        if population:
+            sample_percent = 100.0 * SAMPLE_OVERSAMPLE_FACTOR * limit / population
+            if sample_percent < 100.0:
+                statement = _sample_statement(scenario, limit, sample_percent, columns)
+                transactions = (await fetch(statement)).all()
+
+        # Fall back to a full random scan when the table size is unknown or the
+        # sample came back short
+        if len(transactions) < limit:
+            transactions = (await fetch(_sample_statement(scenario, limit, columns=columns))).all()
 
         logger.debug(
             f"Retrieved {len(transactions)} transactions for scenario '{scenario}'"
@@ -251,9 +380,9 @@ async def get_sample_transactions(
         return []
 
 
-async def get_database_stats(session: AsyncSession) -> dict:
+async def _query_database_stats(session: AsyncSession) -> dict:
     """
-    Get statistics about the engineered_transactions table.
+    Run the aggregate query behind get_database_stats.
 
     Args:
         session: Async database session
@@ -261,38 +390,80 @@ async def get_database_stats(session: AsyncSession) -> dict:
     Returns:
         Dictionary with total_transactions, fraud_count, legit_count, fraud_percentage
     """
+    # Get total and fraud counts in a single scan
+    statement = select(
+        func.count().label("total"),
+        func.count().filter(EngineeredTransaction.is_fraud == 1).label("fraud"),
+    ).select_from(EngineeredTransaction)
+    row = (await session.execute(statement)).one()
+    total_count = row.total or 0
+    fraud_count = row.fraud or 0
+
+    # Calculate legit count and percentage
+    legit_count = total_count - fraud_count
+    fraud_percentage = (fraud_count / total_count * 100) if total_count > 0 else 0.0
+
+    _scenario_row_counts.update(
+        fraud=fraud_count,
+        legit=legit_count,
+        mixed=total_count,
+    )
+
+    stats = {
+        "total_transactions": total_count,
+        "fraud_count": fraud_count,
+        "legit_count": legit_count,
+        "fraud_percentage": round(fraud_percentage, 2),
+    }
+
+    _stats_cache["value"] = stats
+    _stats_cache["expires_at"] = time.monotonic() + settings.stats_cache_ttl_seconds
+
+    logger.debug(f"Database stats: {stats}")
+
+    return stats
+
+
+async def _refresh_database_stats() -> None:
+    """Recompute cached database stats in the background with its own session."""
     try:
-        from app.db_models import EngineeredTransaction
-        from sqlalchemy import func
-
-        # Get total count
-        total_statement = select(func.count()).select_from(EngineeredTransaction)
-        total_result = await session.execute(total_statement)
-        total_count = total_result.scalar() or 0
-
-        # Get fraud count
-        fraud_statement = (
-            select(func.count())
-            .select_from(EngineeredTransaction)
-            .where(EngineeredTransaction.is_fraud == 1)
-        )
-        fraud_result = await session.execute(fraud_statement)
-        fraud_count = fraud_result.scalar() or 0
-
-        # Calculate legit count and percentage
-        legit_count = total_count - fraud_count
-        fraud_percentage = (fraud_count / total_count * 100) if total_count > 0 else 0.0
-
-        stats = {
-            "total_transactions": total_count,
-            "fraud_count": fraud_count,
-            "legit_count": legit_count,
-            "fraud_percentage": round(fraud_percentage, 2),
-        }
+        async with _stats_lock:
+            async with AsyncSessionLocal() as session:
+                await _query_database_stats(session)
+    except Exception as e:
+        logger.error(f"Failed to refresh database stats: {str(e)}", exc_info=True)
+    finally:
+        _stats_cache["refreshing"] = False
+
+
+async def get_database_stats(session: AsyncSession) -> dict:
+    """
+    Get statistics about the engineered_transactions table.
+
+    Results are cached for settings.stats_cache_ttl_seconds. Once the cached value
+    is stale it is still returned immediately while a background task refreshes it.
+
+    Args:
+        session: Async database session
 
-        logger.debug(f"Database stats: {stats}")
+    Returns:
+        Dictionary with total_transactions, fraud_count, legit_count, fraud_percentage
+    """
+    cached = _stats_cache["value"]
+    if cached is not None:
+        if time.monotonic() >= _stats_cache["expires_at"] and not _stats_cache["refreshing"]:
+            _stats_cache["refreshing"] = True
+            task = asyncio.create_task(_refresh_database_stats())
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+        return dict(cached)
 
-        return stats
+    try:
+        async with _stats_lock:
+            # Another request may have populated the cache while we waited
+            if _stats_cache["value"] is not None:
+                return dict(_stats_cache["value"])
+            return dict(await _query_database_stats(session))
 
     except Exception as e:
         logger.error(f"Failed to retrieve database stats: {str(e)}", exc_info=True)
@@ -6,7 +6,9 @@ Converts JSON transactions to DataFrame and applies feature preparation logic.
 import pandas as pd
 import numpy as np
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import AbstractSet, List, Dict, Any, Optional, Tuple
+
+from app.models import Transaction
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +16,39 @@ logger = logging.getLogger(__name__)
 class FeatureEngineer:
     """Feature engineering service for fraud detection model."""
 
+    # Keys under model_features["temporal"] and model_features["amount_ratios"]
+    TEMPORAL_FEATURES = ("trans_in_last_1h", "trans_in_last_24h", "trans_in_last_7d")
+    AMOUNT_RATIO_FEATURES = (
+        "amt_per_card_avg_ratio_1h",
+        "amt_per_card_avg_ratio_24h",
+        "amt_per_card_avg_ratio_7d",
+        "amt_per_category_avg_ratio_1h",
+        "amt_per_category_avg_ratio_24h",
+        "amt_per_category_avg_ratio_7d",
+    )
+
+    # Fraud-window flag for each hour of the day (11 PM - 5 AM and 6 PM - 10 PM),
+    # indexed by hour_of_day so each flag is a single gather over the batch
+    LATE_NIGHT_BY_HOUR = np.array([h >= 23 or h <= 5 for h in range(24)], dtype=np.int8)
+    LATE_EVENING_BY_HOUR = np.array([18 <= h <= 22 for h in range(24)], dtype=np.int8)
+
+    # Placeholders for API transactions, which carry no card history, account or
+    # merchant location; the ML JSON format in fraud_detector is built from these
+    DEFAULT_CARD_SUFFIX = "567890121234"
+    DEFAULT_ACCOUNT_NUMBER = 1234567890123456
+    DEFAULT_HISTORY_FEATURES = {
+        "trans_in_last_1h": 1.0,
+        "trans_in_last_24h": 3.0,
+        "trans_in_last_7d": 15.0,
+        "amt_per_card_avg_ratio_1h": 1.2,
+        "amt_per_card_avg_ratio_24h": 1.1,
+        "amt_per_card_avg_ratio_7d": 1.0,
+        "amt_per_category_avg_ratio_1h": 0.9,
+        "amt_per_category_avg_ratio_24h": 0.8,
+        "amt_per_category_avg_ratio_7d": 0.7,
+        "amt_diff_from_card_median_7d": 50.0,
+    }
+
     def __init__(self):
         """Initialize feature engineer with configuration."""
         self.continuous_skewed_features = [
@@ -41,6 +76,13 @@ class FeatureEngineer:
         self.cols_to_drop_redundant = self.continuous_skewed_features
         self.cols_to_drop = self.cols_to_drop_ids + self.cols_to_drop_redundant
 
+        # Deviation features kept in X whose NaNs are filled with 0.0; the skewed
+        # features are NaN-filled inside the log1p block in prepare_features
+        self.nan_fill_features = [
+            "amt_diff_from_card_median_1d",
+            "amt_diff_from_card_median_7d",
+        ]
+
     def json_to_dataframe(self, transactions: List[Dict[str, Any]]) -> pd.DataFrame:
         """
         Convert JSON transaction format to DataFrame format expected by model.
@@ -52,81 +94,73 @@ class FeatureEngineer:
             pd.DataFrame: DataFrame with columns matching training data format
         """
         try:
-            rows = []
+            # Walk the JSON once, appending into one list per column, and build the
+            # DataFrame from typed arrays instead of a list of per-row dicts
+            trans_nums = []
+            timestamps = []
+            cc_nums = []
+            acct_nums = []
+            merchants = []
+            categories = []
+            amounts = []
+            merch_lats = []
+            merch_longs = []
+            is_fraud = []
+            temporal = {name: [] for name in self.TEMPORAL_FEATURES}
+            amount_ratios = {name: [] for name in self.AMOUNT_RATIO_FEATURES}
+            amt_diffs_7d = []
 
             for tx in transactions:
-                # Extract transaction data
                 transaction = tx["transaction"]
+                merchant = transaction["merchant"]
                 model_features = tx["model_features"]
-                ground_truth = tx["ground_truth"]
-
-                # Create row matching original DataFrame structure
-                row = {
-                    # ID fields (will be dropped before modeling)
-                    "trans_num": transaction["id"],
-                    "trans_datetime": pd.to_datetime(transaction["timestamp"]),
-                    "cc_num": int(transaction["card"]["full"]),
-                    "acct_num": int(transaction["account"]["full"]),
-                    "merchant": transaction["merchant"]["name"],
-                    "category": transaction["merchant"]["category"]
-                    .lower()
-                    .replace(" & ", "_")
-                    .replace(" ", "_"),
-                    # Basic transaction features
-                    "amt": transaction["amount"],
-                    "merch_lat": transaction["merchant"]["location"]["lat"],
-                    "merch_long": transaction["merchant"]["location"]["lng"],
-                    # Target variable
-                    "is_fraud": int(ground_truth["is_fraud"]),
-                    # Model features - temporal
-                    "trans_in_last_1h": model_features["temporal"]["trans_in_last_1h"],
-                    "trans_in_last_24h": model_features["temporal"]["trans_in_last_24h"],
-                    "trans_in_last_7d": model_features["temporal"]["trans_in_last_7d"],
-                    # Model features - amount ratios
-                    "amt_per_card_avg_ratio_1h": model_features["amount_ratios"][
-                        "amt_per_card_avg_ratio_1h"
-                    ],
-                    "amt_per_card_avg_ratio_24h": model_features["amount_ratios"][
-                        "amt_per_card_avg_ratio_24h"
-                    ],
-                    "amt_per_card_avg_ratio_7d": model_features["amount_ratios"][
-                        "amt_per_card_avg_ratio_7d"
-                    ],
-                    "amt_per_category_avg_ratio_1h": model_features["amount_ratios"][
-                        "amt_per_category_avg_ratio_1h"
-                    ],
-                    "amt_per_category_avg_ratio_24h": model_features["amount_ratios"][
-                        "amt_per_category_avg_ratio_24h"
-                    ],
-                    "amt_per_category_avg_ratio_7d": model_features["amount_ratios"][
-                        "amt_per_category_avg_ratio_7d"
-                    ],
-                    # Model features - deviations
-                    "amt_diff_from_card_median_7d": model_features["deviations"][
-                        "amt_diff_from_card_median_7d"
-                    ],
-                }
-
-                # Add any additional features that might exist in the original data
-                # These would need to be computed from the transaction data in a real system
-                # For now, we'll set them to reasonable defaults if they're missing
-
-                # Extract hour of day from timestamp
-                row["hour_of_day"] = row["trans_datetime"].hour
-                row["day_of_week"] = row["trans_datetime"].weekday()
-                row["is_late_night_fraud_window"] = (
-                    1 if row["hour_of_day"] >= 23 or row["hour_of_day"] <= 5 else 0
-                )
-                row["is_late_evening_fraud_window"] = 1 if 18 <= row["hour_of_day"] <= 22 else 0
-
-                # Set defaults for features we don't have
-                row["time_since_last_trans_seconds"] = 0.0  # Would need transaction history
-                row["trans_speed_kmh"] = 0.0  # Would need previous location
-                row["amt_diff_from_card_median_1d"] = 0.0  # Would need recent history
-
-                rows.append(row)
-
-            df = pd.DataFrame(rows)
+
+                # ID fields (will be dropped before modeling)
+                trans_nums.append(transaction["id"])
+                timestamps.append(transaction["timestamp"])
+                cc_nums.append(transaction["card"]["full"])
+                acct_nums.append(transaction["account"]["full"])
+                merchants.append(merchant["name"])
+                categories.append(merchant["category"])
+
+                # Basic transaction features
+                amounts.append(transaction["amount"])
+                merch_lats.append(merchant["location"]["lat"])
+                merch_longs.append(merchant["location"]["lng"])
+
+                # Target variable
+                is_fraud.append(tx["ground_truth"]["is_fraud"])
+
+                # Model features - temporal, amount ratios and deviations
+                for name, values in temporal.items():
+                    values.append(model_features["temporal"][name])
+                for name, values in amount_ratios.items():
+                    values.append(model_features["amount_ratios"][name])
+                amt_diffs_7d.append(model_features["deviations"]["amt_diff_from_card_median_7d"])
+
+            df = self._build_dataframe(
+                trans_nums=trans_nums,
+                timestamps=timestamps,
+                cc_nums=cc_nums,
+                acct_nums=acct_nums,
+                merchants=merchants,
+                categories=categories,
+                amounts=np.array(amounts, dtype=np.float64),
+                merch_lats=np.array(merch_lats, dtype=np.float64),
+                merch_longs=np.array(merch_longs, dtype=np.float64),
+                is_fraud=np.array(is_fraud, dtype=np.int8),
+                history_features={
+                    **{
+                        name: np.array(values, dtype=np.float64)
+                        for name, values in temporal.items()
+                    },
+                    **{
+                        name: np.array(values, dtype=np.float64)
+                        for name, values in amount_ratios.items()
+                    },
+                    "amt_diff_from_card_median_7d": np.array(amt_diffs_7d, dtype=np.float64),
+                },
+            )
             logger.info(
                 f"✅ Converted {len(transactions)} transactions to DataFrame with {df.shape[1]} columns"
             )
@@ -137,11 +171,179 @@ class FeatureEngineer:
             logger.error(f"Failed to convert JSON to DataFrame: {str(e)}", exc_info=True)
             raise ValueError(f"JSON to DataFrame conversion failed: {str(e)}")
 
+    def transactions_to_dataframe(self, transactions: List[Transaction]) -> pd.DataFrame:
+        """
+        Convert validated API transactions straight to the model DataFrame.
+
+        Reads the Transaction attributes column by column instead of going through
+        the nested JSON format; history features the API does not carry are filled
+        from ``DEFAULT_HISTORY_FEATURES``.
+
+        Args:
+            transactions: List of validated Transaction models
+
+        Returns:
+            pd.DataFrame: DataFrame with columns matching training data format
+        """
+        try:
+            n = len(transactions)
+            trans_nums = []
+            timestamps = []
+            cc_nums = []
+            merchants = []
+            categories = []
+            amounts = []
+            hours = []
+            weekdays = []
+
+            for txn in transactions:
+                trans_nums.append(txn.transaction_id)
+                timestamp = txn.timestamp
+                timestamps.append(timestamp)
+                # Timestamps are already datetimes, so read the calendar fields here
+                # rather than back out of the parsed index
+                hours.append(timestamp.hour)
+                weekdays.append(timestamp.weekday())
+                cc_nums.append(txn.card_number + self.DEFAULT_CARD_SUFFIX)
+                merchants.append(txn.merchant_name)
+                categories.append(txn.merchant_category)
+                amounts.append(txn.amount)
+
+            df = self._build_dataframe(
+                trans_nums=trans_nums,
+                timestamps=timestamps,
+                cc_nums=cc_nums,
+                acct_nums=[self.DEFAULT_ACCOUNT_NUMBER] * n,
+                merchants=merchants,
+                categories=categories,
+                amounts=np.array(amounts, dtype=np.float64),
+                merch_lats=np.zeros(n, dtype=np.float64),
+                merch_longs=np.zeros(n, dtype=np.float64),
+                is_fraud=np.zeros(n, dtype=np.int8),
+                history_features={
+                    name: np.full(n, value, dtype=np.float64)
+                    for name, value in self.DEFAULT_HISTORY_FEATURES.items()
+                },
+                hour_of_day=np.array(hours, dtype=np.int64),
+                day_of_week=np.array(weekdays, dtype=np.int64),
+            )
+            logger.info(f"✅ Converted {n} transactions to DataFrame with {df.shape[1]} columns")
+
+            return df
+
+        except Exception as e:
+            logger.error(f"Failed to convert transactions to DataFrame: {str(e)}", exc_info=True)
+            raise ValueError(f"Transaction to DataFrame conversion failed: {str(e)}")
+
+    def _build_dataframe(
+        self,
+        trans_nums: List[str],
+        timestamps: List[Any],
+        cc_nums: List[Any],
+        acct_nums: List[Any],
+        merchants: List[str],
+        categories: List[str],
+        amounts: np.ndarray,
+        merch_lats: np.ndarray,
+        merch_longs: np.ndarray,
+        is_fraud: np.ndarray,
+        history_features: Dict[str, np.ndarray],
+        hour_of_day: Optional[np.ndarray] = None,
+        day_of_week: Optional[np.ndarray] = None,
+    ) -> pd.DataFrame:
+        """
+        Assemble the model DataFrame from per-column values.
+
+        Args:
+            trans_nums .. is_fraud: Raw transaction columns, one value per transaction;
+                card and account numbers are kept as given, since they are dropped
+                before modeling and full card numbers overflow int64
+            history_features: Temporal, amount ratio and 7d deviation columns, in
+                training column order
+            hour_of_day: Local hour of each timestamp; derived from the parsed
+                timestamps when not given
+            day_of_week: Weekday of each timestamp (Monday=0); derived from the
+                parsed timestamps when not given
+
+        Returns:
+            pd.DataFrame: DataFrame with columns matching training data format
+        """
+        # Categories repeat heavily within a batch, so normalize each distinct value once
+        normalized_categories = {}
+        for raw in categories:
+            if raw not in normalized_categories:
+                normalized_categories[raw] = raw.lower().replace(" & ", "_").replace(" ", "_")
+        categories = [normalized_categories[raw] for raw in categories]
+
+        trans_datetime = self._parse_timestamps(timestamps)
+
+        # Extract hour of day from timestamp
+        if hour_of_day is None or day_of_week is None:
+            if isinstance(trans_datetime, pd.DatetimeIndex):
+                hour_of_day = trans_datetime.hour.to_numpy(dtype=np.int64)
+                day_of_week = trans_datetime.weekday.to_numpy(dtype=np.int64)
+            else:
+                hour_of_day = np.fromiter((ts.hour for ts in trans_datetime), dtype=np.int64)
+                day_of_week = np.fromiter((ts.weekday() for ts in trans_datetime), dtype=np.int64)
+        is_late_night_fraud_window = self.LATE_NIGHT_BY_HOUR[hour_of_day]
+        is_late_evening_fraud_window = self.LATE_EVENING_BY_HOUR[hour_of_day]
+
+        # Column order matches the original training DataFrame
+        return pd.DataFrame(
+            {
+                "trans_num": trans_nums,
+                "trans_datetime": trans_datetime,
+                "cc_num": cc_nums,
+                "acct_num": acct_nums,
+                "merchant": merchants,
+                "category": categories,
+                "amt": amounts,
+                "merch_lat": merch_lats,
+                "merch_long": merch_longs,
+                "is_fraud": is_fraud,
+                **history_features,
+                "hour_of_day": hour_of_day,
+                "day_of_week": day_of_week,
+                "is_late_night_fraud_window": is_late_night_fraud_window,
+                "is_late_evening_fraud_window": is_late_evening_fraud_window,
+                # Defaults for features we don't have; these would need
+                # transaction history / previous location in a real system
+                "time_since_last_trans_seconds": 0.0,
+                "trans_speed_kmh": 0.0,
+                "amt_diff_from_card_median_1d": 0.0,
+            }
+        )
+
+    @staticmethod
+    def _parse_timestamps(timestamps: List[Any]) -> pd.Index:
+        """
+        Parse transaction timestamps in a single batch.
+
+        Each timestamp keeps its own UTC offset, so hour-based features use the
+        local wall-clock time of the transaction. The explicit ISO 8601 format
+        skips per-batch format inference and also accepts batches that mix ISO
+        variants (``Z`` vs ``+00:00``, with or without fractional seconds).
+
+        Args:
+            timestamps: ISO 8601 timestamp strings or datetime objects
+
+        Returns:
+            pd.Index: DatetimeIndex, or an object Index of Timestamps when the batch
+            mixes UTC offsets and cannot share a single timezone
+        """
+        try:
+            return pd.DatetimeIndex(pd.to_datetime(timestamps, format="ISO8601", cache=True))
+        except (ValueError, TypeError):
+            return pd.Index([pd.Timestamp(ts) for ts in timestamps], dtype=object)
+
     def prepare_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
         """
         Prepare features for model training/prediction by applying transformations.
         This replicates the exact logic from the training pipeline.
 
+        The log-transformed columns are added to ``df`` in place, so pass a copy if
+        the caller still needs the untouched frame.
+
         Args:
             df: DataFrame with transaction data
 
@@ -149,31 +351,32 @@ class FeatureEngineer:
             tuple: (X_features, y_target)
         """
         try:
-            # Make a copy to avoid modifying original
-            transformed_df = df.copy()
+            # json_to_dataframe hands over a fresh frame, so transform it in place
+            transformed_df = df
 
             target_col = "is_fraud"
 
             # 1. Handle NaNs in continuous features before transformation
             # Fill with 0.0 as it often implies 'no prior activity/difference'
-            nan_fill_features = self.continuous_skewed_features + [
-                "amt_diff_from_card_median_1d",
-                "amt_diff_from_card_median_7d",
-            ]
-            for col in nan_fill_features:
+            for col in self.nan_fill_features:
                 if col in transformed_df.columns:
                     transformed_df[col] = transformed_df[col].fillna(0.0)
 
             # 2. Apply log1p transformation to specified features, creating new columns
-            features_to_drop_after_log = []
-            for feature in self.continuous_skewed_features:
-                if feature in transformed_df.columns:
-                    new_log_feature_name = f"log_{feature}"
-                    # Ensure values are non-negative before log1p
-                    transformed_df[new_log_feature_name] = np.log1p(
-                        transformed_df[feature].clip(lower=0)
-                    )
-                    features_to_drop_after_log.append(feature)  # Mark original for dropping
+            # NaN fill, clip and log1p run in place over one contiguous block instead of
+            # per column; the untransformed skewed columns are dropped from X below
+            log_features = [
+                feature
+                for feature in self.continuous_skewed_features
+                if feature in transformed_df.columns
+            ]
+            if log_features:
+                block = transformed_df[log_features].to_numpy(dtype=np.float64, copy=True)
+                block[np.isnan(block)] = 0.0
+                # Ensure values are non-negative before log1p
+                np.maximum(block, 0.0, out=block)
+                np.log1p(block, out=block)
+                transformed_df[[f"log_{feature}" for feature in log_features]] = block
 
             # 3. Create feature matrix X and target vector y
             # Drop ID columns and original untransformed features
@@ -216,26 +419,29 @@ class FeatureEngineer:
             logger.error(f"❌ Transaction processing failed: {str(e)}", exc_info=True)
             raise ValueError(f"Transaction processing failed: {str(e)}")
 
-    def validate_features(self, X: pd.DataFrame, expected_features: List[str]) -> bool:
+    def validate_features(
+        self, X: pd.DataFrame, expected_features: AbstractSet[str] | List[str]
+    ) -> bool:
         """
         Validate that the feature matrix has the expected features.
 
         Args:
             X: Feature matrix
-            expected_features: List of expected feature names
+            expected_features: Expected feature names; pass a prebuilt frozenset to
+                skip rebuilding the set on every call
 
         Returns:
             bool: True if features match expected, False otherwise
         """
         try:
-            actual_features = set(X.columns)
-            expected_features = set(expected_features)
+            if not isinstance(expected_features, AbstractSet):
+                expected_features = frozenset(expected_features)
 
-            missing_features = expected_features - actual_features
-            extra_features = actual_features - expected_features
+            missing_features = expected_features.difference(X.columns)
+            extra_features = {col for col in X.columns if col not in expected_features}
 
             if missing_features:
-                logger.warning(f"Missing features: {missing_features}")
+                logger.warning(f"Missing features: {set(missing_features)}")
 
             if extra_features:
                 logger.warning(f"Extra features: {extra_features}")
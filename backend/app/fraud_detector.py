@@ -1,14 +1,16 @@
 """Fraud detection service with ML model integration and red-team detection."""
 
 import re
-from typing import List, Optional, Dict, Any
+from typing import ClassVar, List, Optional
 from app.models import (
     Transaction,
     FraudDetectionResponse,
     Citation,
+    FraudClassification,
     RefusalResponse,
 )
 from app.config import settings
+from app.feature_engineering import FeatureEngineer
 from app.model_service import model_service
 import logging
 
@@ -18,14 +20,13 @@ logger = logging.getLogger(__name__)
 class FraudDetectionService:
     """Service for detecting fraudulent transactions using ML model with security checks."""
 
-    # Red-team prompt injection patterns
+    # Red-team prompt injection patterns, matched against lowercased text
     RED_TEAM_PATTERNS = [
         r"ignore\s+(previous|all|your)\s+instructions?",
         r"system\s*prompt",
         r"you\s+are\s+now",
         r"forget\s+(everything|all|previous)",
         r"new\s+instructions?:",
-        r"<\|.*?\|>",  # Special tokens
         r"\\x[0-9a-f]{2}",  # Hex escape sequences
         r"&#\d+;",  # HTML entities
         r"eval\(",
@@ -33,104 +34,195 @@ class FraudDetectionService:
         r"__import__",
     ]
 
-    def __init__(self):
-        """Initialize fraud detection service."""
-        self.red_team_pattern = re.compile("|".join(self.RED_TEAM_PATTERNS), re.IGNORECASE)
+    # Special tokens: same matches as r"<\|.*?\|>", but anchored on the first "<|" of
+    # each line so a run of "<|" is scanned once instead of once per "<|"
+    SPECIAL_TOKEN_PATTERN = r"(?m)^(?>[^\n]*?<\|)[^\n]*?\|>"
+
+    # All patterns joined into one alternation and compiled once at class definition,
+    # so each field is scanned in a single pass instead of once per pattern.
+    # IGNORECASE stops re from using its literal-prefix scan, so text is lowercased
+    # once and matched case-sensitively; the table folds the characters IGNORECASE
+    # treats as "i"/"s" but str.lower() leaves alone.
+    red_team_pattern: ClassVar[re.Pattern] = re.compile("|".join(RED_TEAM_PATTERNS))
+    special_token_pattern: ClassVar[re.Pattern] = re.compile(SPECIAL_TOKEN_PATTERN)
+    _CASE_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s"})
+
+    # Joins a batch's fields for a single scan. No pattern matches across it: the
+    # special-token pattern stops at "\n" and no keyword pattern accepts "\x00"
+    _FIELD_SEPARATOR = "\n\x00"
+
+    # Number of PII fields checked per transaction (cardholder name, IP, device)
+    PII_FIELD_COUNT = 3
+
+    # Placeholder parts of the ML model JSON format, built from the FeatureEngineer
+    # defaults. Every converted transaction shares these dicts instead of rebuilding
+    # them; consumers only read them
+    ML_DEFAULT_LOCATION = {"lat": 0.0, "lng": 0.0}  # Default coordinates
+    ML_DEFAULT_ACCOUNT = {"number": "1234", "full": str(FeatureEngineer.DEFAULT_ACCOUNT_NUMBER)}
+    ML_DEFAULT_MODEL_FEATURES = {
+        "temporal": {
+            name: FeatureEngineer.DEFAULT_HISTORY_FEATURES[name]
+            for name in FeatureEngineer.TEMPORAL_FEATURES
+        },
+        "amount_ratios": {
+            name: FeatureEngineer.DEFAULT_HISTORY_FEATURES[name]
+            for name in FeatureEngineer.AMOUNT_RATIO_FEATURES
+        },
+        "deviations": {
+            "amt_diff_from_card_median_7d": FeatureEngineer.DEFAULT_HISTORY_FEATURES[
+                "amt_diff_from_card_median_7d"
+            ]
+        },
+    }
+    ML_DEFAULT_GROUND_TRUTH = {"is_fraud": False}  # Default, not used in prediction
+
+    # Citations attached to every ML analysis; Citation is frozen, so responses share
+    # these instances instead of validating new ones per request
+    ML_CITATIONS = (
+        Citation(
+            source="XGBoost Fraud Detection Model",
+            url="https://xgboost.readthedocs.io/en/stable/",
+        ),
+        Citation(
+            source="SHAP Model Explainability",
+            url="https://shap.readthedocs.io/en/latest/",
+        ),
+    )
 
     def check_red_team_attack(self, text: str) -> bool:
         """Check if text contains red-team prompt injection attempts."""
         if not settings.enable_red_team_detection:
             return False
-        return bool(self.red_team_pattern.search(text))
+        return self._is_red_team(text)
+
+    @classmethod
+    def _batch_has_red_team(cls, transactions: List[Transaction]) -> bool:
+        """Scan every merchant name and device fingerprint in the batch at once."""
+        # Merchant names repeat within a batch, so each distinct value is scanned once
+        fields = {}
+        for txn in transactions:
+            fields[txn.merchant_name] = None
+            if txn.device_fingerprint:
+                fields[txn.device_fingerprint] = None
+        return cls._is_red_team(cls._FIELD_SEPARATOR.join(fields))
+
+    @classmethod
+    def _is_red_team(cls, text: str) -> bool:
+        """Match text against the red-team patterns, ignoring case."""
+        text = text.lower() if text.isascii() else text.translate(cls._CASE_FOLD).lower()
+        if cls.red_team_pattern.search(text):
+            return True
+        return "<|" in text and cls.special_token_pattern.search(text) is not None
 
     def check_pii_policy(self, transactions: List[Transaction]) -> Optional[RefusalResponse]:
         """Check if transactions violate PII policy."""
-        if not settings.pii_mask_enabled:
+        max_pii_fields = settings.max_pii_fields_allowed
+        # No transaction can exceed a limit that covers every PII field
+        if not settings.pii_mask_enabled or max_pii_fields >= self.PII_FIELD_COUNT:
             return None
 
         # Count transactions with excessive PII
         pii_violations = 0
         for txn in transactions:
-            pii_count = 0
-            if txn.cardholder_name:
-                pii_count += 1
-            if txn.ip_address:
-                pii_count += 1
-            if txn.device_fingerprint:
-                pii_count += 1
-
-            if pii_count > settings.max_pii_fields_allowed:
-                pii_violations += 1
-
-        # Refuse if more than 10% of transactions have excessive PII
-        if pii_violations > len(transactions) * 0.1:
-            return RefusalResponse(
-                reason="PII Policy Violation",
-                details=f"{pii_violations} transactions contain excessive PII fields. "
-                f"Maximum {settings.max_pii_fields_allowed} PII fields allowed per transaction.",
+            pii_count = (
+                bool(txn.cardholder_name) + bool(txn.ip_address) + bool(txn.device_fingerprint)
             )
+            if pii_count > max_pii_fields:
+                pii_violations += 1
 
-        return None
+        return self._pii_refusal(pii_violations, len(transactions), max_pii_fields)
 
     def check_red_team_in_transactions(
         self, transactions: List[Transaction]
     ) -> Optional[RefusalResponse]:
         """Check transactions for red-team attacks in merchant names and device fingerprints."""
+        # Most batches are clean, so scan them whole and only look for the offending
+        # field on a hit
+        if not settings.enable_red_team_detection or not self._batch_has_red_team(transactions):
+            return None
+
+        is_red_team = self._is_red_team
         for txn in transactions:
             # Check merchant name
-            if self.check_red_team_attack(txn.merchant_name):
-                return RefusalResponse(
-                    reason="Security Policy Violation",
-                    details=f"Potential prompt injection detected in transaction {txn.transaction_id} "
-                    f"merchant name. Request refused for security reasons.",
-                )
+            if is_red_team(txn.merchant_name):
+                return self._red_team_refusal(txn.transaction_id, "merchant name")
 
             # Check device fingerprint
-            if txn.device_fingerprint and self.check_red_team_attack(txn.device_fingerprint):
-                return RefusalResponse(
-                    reason="Security Policy Violation",
-                    details=f"Potential prompt injection detected in transaction {txn.transaction_id} "
-                    f"device fingerprint. Request refused for security reasons.",
+            if txn.device_fingerprint and is_red_team(txn.device_fingerprint):
+                return self._red_team_refusal(txn.transaction_id, "device fingerprint")
+
+        return None
+
+    def check_transaction_policies(
+        self, transactions: List[Transaction]
+    ) -> Optional[RefusalResponse]:
+        """
+        Run the PII and red-team checks in a single pass over the batch.
+
+        A PII refusal takes precedence over a red-team refusal, as when running
+        check_pii_policy before check_red_team_in_transactions.
+        """
+        max_pii_fields = settings.max_pii_fields_allowed
+        check_pii = settings.pii_mask_enabled and max_pii_fields < self.PII_FIELD_COUNT
+        is_red_team = None
+        if settings.enable_red_team_detection and self._batch_has_red_team(transactions):
+            is_red_team = self._is_red_team
+
+        pii_violations = 0
+        red_team_refusal = None
+        for txn in transactions:
+            device_fingerprint = txn.device_fingerprint
+
+            if check_pii:
+                pii_count = (
+                    bool(txn.cardholder_name) + bool(txn.ip_address) + bool(device_fingerprint)
                 )
+                if pii_count > max_pii_fields:
+                    pii_violations += 1
+
+            # Only the first red-team hit is reported; PII counting still covers the batch
+            if is_red_team is not None:
+                if is_red_team(txn.merchant_name):
+                    red_team_refusal = self._red_team_refusal(txn.transaction_id, "merchant name")
+                    is_red_team = None
+                elif device_fingerprint and is_red_team(device_fingerprint):
+                    red_team_refusal = self._red_team_refusal(
+                        txn.transaction_id, "device fingerprint"
+                    )
+                    is_red_team = None
+
+            if red_team_refusal is not None and not check_pii:
+                break
+
+        if check_pii:
+            pii_refusal = self._pii_refusal(pii_violations, len(transactions), max_pii_fields)
+            if pii_refusal:
+                return pii_refusal
+
+        return red_team_refusal
+
+    @staticmethod
+    def _pii_refusal(
+        pii_violations: int, total_transactions: int, max_pii_fields: int
+    ) -> Optional[RefusalResponse]:
+        """Refuse if more than 10% of transactions have excessive PII."""
+        if pii_violations > total_transactions * 0.1:
+            return RefusalResponse(
+                reason="PII Policy Violation",
+                details=f"{pii_violations} transactions contain excessive PII fields. "
+                f"Maximum {max_pii_fields} PII fields allowed per transaction.",
+            )
 
         return None
 
-    def convert_transaction_to_ml_format(self, transaction: Transaction) -> Dict[str, Any]:
-        """Convert Transaction model to ML model JSON format."""
-        return {
-            "transaction": {
-                "id": transaction.transaction_id,
-                "timestamp": transaction.timestamp.isoformat(),
-                "merchant": {
-                    "name": transaction.merchant_name,
-                    "category": transaction.merchant_category,
-                    "location": {"lat": 0.0, "lng": 0.0},  # Default coordinates
-                },
-                "amount": transaction.amount,
-                "card": {
-                    "number": transaction.card_number,
-                    "full": f"{transaction.card_number}567890121234",
-                },
-                "account": {"number": "1234", "full": "1234567890123456"},
-            },
-            "model_features": {
-                "temporal": {
-                    "trans_in_last_1h": 1.0,
-                    "trans_in_last_24h": 3.0,
-                    "trans_in_last_7d": 15.0,
-                },
-                "amount_ratios": {
-                    "amt_per_card_avg_ratio_1h": 1.2,
-                    "amt_per_card_avg_ratio_24h": 1.1,
-                    "amt_per_card_avg_ratio_7d": 1.0,
-                    "amt_per_category_avg_ratio_1h": 0.9,
-                    "amt_per_category_avg_ratio_24h": 0.8,
-                    "amt_per_category_avg_ratio_7d": 0.7,
-                },
-                "deviations": {"amt_diff_from_card_median_7d": 50.0},
-            },
-            "ground_truth": {"is_fraud": False},  # Default, not used in prediction
-        }
+    @staticmethod
+    def _red_team_refusal(transaction_id: str, field: str) -> RefusalResponse:
+        """Build the refusal for a prompt injection found in ``field`` of a transaction."""
+        return RefusalResponse(
+            reason="Security Policy Violation",
+            details=f"Potential prompt injection detected in transaction {transaction_id} "
+            f"{field}. Request refused for security reasons.",
+        )
 
     def analyze_transactions(
         self, transactions: List[Transaction]
@@ -140,29 +232,23 @@ class FraudDetectionService:
         Returns either analysis results or a refusal response.
         """
         # Check batch size policy
-        if len(transactions) > settings.max_transactions_per_request:
+        max_transactions = settings.max_transactions_per_request
+        if len(transactions) > max_transactions:
             return RefusalResponse(
                 reason="Batch Size Exceeded",
-                details=f"Maximum {settings.max_transactions_per_request} transactions allowed per request. "
+                details=f"Maximum {max_transactions} transactions allowed per request. "
                 f"Received {len(transactions)} transactions.",
             )
 
-        # Check PII policy
-        pii_refusal = self.check_pii_policy(transactions)
-        if pii_refusal:
-            return pii_refusal
-
-        # Check for red-team attacks
-        red_team_refusal = self.check_red_team_in_transactions(transactions)
-        if red_team_refusal:
-            return red_team_refusal
+        # Check PII policy and red-team attacks in one pass
+        policy_refusal = self.check_transaction_policies(transactions)
+        if policy_refusal:
+            return policy_refusal
 
-        # Convert transactions to ML model format
+        # Use the real ML model for predictions; features are built straight from
+        # the Transaction models without the intermediate JSON format
         try:
-            ml_transactions = [self.convert_transaction_to_ml_format(txn) for txn in transactions]
-
-            # Use the real ML model for predictions
-            analyses = model_service.predict_transactions(ml_transactions)
+            analyses = model_service.predict_api_transactions(transactions)
             warnings = []
 
         except Exception as e:
@@ -170,43 +256,35 @@ class FraudDetectionService:
             warnings = [f"ML model prediction failed: {str(e)}"]
             analyses = []
 
-        # Calculate statistics from ML model results
-        fraudulent_count = (
-            sum(1 for a in analyses if a.classification.value == "fraudulent") if analyses else 0
-        )
-        suspicious_count = (
-            sum(1 for a in analyses if a.classification.value == "suspicious") if analyses else 0
-        )
-        legitimate_count = (
-            sum(1 for a in analyses if a.classification.value == "legitimate") if analyses else 0
-        )
+        # Calculate statistics from ML model results in a single pass; enum members
+        # are singletons, so compare by identity
+        fraudulent_count = suspicious_count = legitimate_count = 0
+        total_risk_score = 0.0
+        for a in analyses:
+            classification = a.classification
+            if classification is FraudClassification.FRAUDULENT:
+                fraudulent_count += 1
+            elif classification is FraudClassification.SUSPICIOUS:
+                suspicious_count += 1
+            elif classification is FraudClassification.LEGITIMATE:
+                legitimate_count += 1
+            total_risk_score += a.risk_score
 
-        avg_risk_score = sum(a.risk_score for a in analyses) / len(analyses) if analyses else 0.0
+        avg_risk_score = total_risk_score / len(analyses) if analyses else 0.0
 
         # Generate summary for ML model results
-        total_transactions = len(transactions)
-        summary = f"ML Model analyzed {total_transactions} transactions: "
-        summary += f"{fraudulent_count} fraudulent, {suspicious_count} suspicious, {legitimate_count} legitimate. "
-        summary += f"Average risk score: {avg_risk_score:.1%}."
-
         if fraudulent_count > 0:
-            summary += " ⚠️ IMMEDIATE ACTION REQUIRED for fraudulent transactions."
+            action = "⚠️ IMMEDIATE ACTION REQUIRED for fraudulent transactions."
         elif suspicious_count > 0:
-            summary += " ⚠️ Review recommended for suspicious transactions."
+            action = "⚠️ Review recommended for suspicious transactions."
         else:
-            summary += " ✓ All transactions appear safe."
-
-        # Add ML model citations
-        citations = [
-            Citation(
-                source="XGBoost Fraud Detection Model",
-                url="https://xgboost.readthedocs.io/en/stable/",
-            ),
-            Citation(
-                source="SHAP Model Explainability",
-                url="https://shap.readthedocs.io/en/latest/",
-            ),
-        ]
+            action = "✓ All transactions appear safe."
+        summary = (
+            f"ML Model analyzed {len(transactions)} transactions: "
+            f"{fraudulent_count} fraudulent, {suspicious_count} suspicious, "
+            f"{legitimate_count} legitimate. "
+            f"Average risk score: {avg_risk_score:.1%}. {action}"
+        )
 
         return FraudDetectionResponse(
             summary=summary,
@@ -216,7 +294,7 @@ class FraudDetectionService:
             legitimate_count=legitimate_count,
             average_risk_score=round(avg_risk_score, 3),
             analyses=analyses,  # ML model analyses already in correct format
-            citations=citations,
+            citations=list(self.ML_CITATIONS),
             warnings=warnings,
         )
 
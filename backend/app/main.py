@@ -1,20 +1,27 @@
 """Main FastAPI application."""
 
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Union
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, List, Union
 
-from fastapi import FastAPI, HTTPException, status, Depends
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request, Response, status, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+from pydantic_core import from_json, to_json
 
 from app.config import settings
+from app.feature_engineering import FeatureEngineer
 from app.fraud_detector import fraud_detector
 from app.model_service import model_service
 from app.models import (
     DatabaseStatsResponse,
     EngineeredTransactionResponse,
     ErrorResponse,
+    FraudAnalysis,
+    FraudClassification,
     FraudDetectionResponse,
     HealthCheckResponse,
     LLMExplanationRequest,
@@ -35,8 +42,13 @@ from app.prediction_models import (
     ModelVersionResponse,
 )
 from app.database import init_db, close_db, get_db
-from app.db_service import save_batch_analyses, get_sample_transactions, get_database_stats
+from app.db_service import (
+    save_batch_analyses_in_background,
+    get_sample_transactions,
+    get_database_stats,
+)
 from app.model_loader import model_loader
+from app.prediction_batcher import InferenceOverloadedError, PredictionBatcher
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Configure logging
@@ -45,12 +57,70 @@ logger = logging.getLogger(__name__)
 # Initialize observability
 setup_observability()
 
+
+class FastJSONRequest(Request):
+    """Request that decodes JSON bodies with pydantic-core's parser instead of stdlib json."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            try:
+                self._json = from_json(await self.body())
+            except ValueError:
+                # Let stdlib json raise the JSONDecodeError FastAPI turns into a 422
+                return await super().json()
+        return self._json
+
+
+class FastJSONRoute(APIRoute):
+    """Route class that hands endpoints a FastJSONRequest."""
+
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            return await original_route_handler(FastJSONRequest(request.scope, request.receive))
+
+        return route_handler
+
+
+def warm_up_model() -> None:
+    """Load the model and score one placeholder transaction to pay first-call setup costs."""
+    model_service.predict_transactions([convert_json_to_ml_format({})])
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Initialize the database and model before serving; close connections on shutdown."""
+    try:
+        await init_db()
+        logger.info("✅ Application startup complete")
+    except Exception as e:
+        logger.error(f"❌ Startup failed: {str(e)}", exc_info=True)
+
+    # Without this the first prediction request would pay for the model's first call
+    try:
+        await asyncio.to_thread(warm_up_model)
+    except Exception as e:
+        logger.error(f"❌ Model warm-up failed: {str(e)}", exc_info=True)
+
+    yield
+
+    try:
+        await close_db()
+        await openrouter_service.close()
+        logger.info("✅ Application shutdown complete")
+    except Exception as e:
+        logger.error(f"❌ Shutdown failed: {str(e)}", exc_info=True)
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="AI-powered credit card fraud detection API with MCP integration",
+    lifespan=lifespan,
 )
+app.router.route_class = FastJSONRoute
 
 # Configure CORS
 app.add_middleware(
@@ -65,75 +135,118 @@ app.add_middleware(
 instrument_app(app)
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database on application startup."""
-    try:
-        await init_db()
-        logger.info("✅ Application startup complete")
-    except Exception as e:
-        logger.error(f"❌ Startup failed: {str(e)}", exc_info=True)
+# Citations attached to every /api/predict response
+ML_PREDICT_CITATIONS = [
+    {
+        "source": "XGBoost Fraud Detection Model",
+        "url": "https://xgboost.readthedocs.io/en/stable/",
+    }
+]
 
+# Caps model batches in flight so a burst of requests queues here instead of piling
+# up converted batches and analyses in memory
+inference_slots = asyncio.Semaphore(settings.max_concurrent_inferences)
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Close database connections on application shutdown."""
+
+@asynccontextmanager
+async def inference_slot() -> AsyncIterator[None]:
+    """Hold one inference slot, failing with InferenceOverloadedError if none frees up in time."""
     try:
-        await close_db()
-        logger.info("✅ Application shutdown complete")
-    except Exception as e:
-        logger.error(f"❌ Shutdown failed: {str(e)}", exc_info=True)
+        await asyncio.wait_for(
+            inference_slots.acquire(), timeout=settings.inference_queue_timeout_seconds
+        )
+    except asyncio.TimeoutError:
+        raise InferenceOverloadedError("Too many predictions in progress, please retry shortly")
+    try:
+        yield
+    finally:
+        inference_slots.release()
+
+
+async def run_prediction_batch(
+    ml_transactions: List[Dict[str, Any]], cache_keys: List[Hashable]
+) -> List[FraudAnalysis]:
+    """Score one (possibly merged) /api/predict batch in a worker thread."""
+    async with inference_slot():
+        return await asyncio.to_thread(
+            model_service.predict_transactions_cached, ml_transactions, cache_keys
+        )
+
+
+# Concurrent /api/predict requests share model calls
+predict_batcher = PredictionBatcher(
+    run_prediction_batch,
+    max_batch_size=settings.predict_batch_max_size,
+    max_wait_seconds=settings.predict_batch_max_wait_ms / 1000,
+)
+
+
+# Request fields read by convert_json_to_ml_format; together they determine the model
+# input, so they key the prediction cache
+ML_FORMAT_FIELDS = (
+    "transaction_id",
+    "timestamp",
+    "merchant_name",
+    "merchant_category",
+    "amount",
+    "card_number",
+)
 
 
 def convert_json_to_ml_format(json_transaction: dict) -> dict:
     """Convert simple JSON transaction to ML model format."""
+    # Only the per-transaction fields are built here; the constant parts are shared
+    get = json_transaction.get
+    card_number = get("card_number", "0000")
     return {
         "transaction": {
-            "id": json_transaction.get("transaction_id", "unknown"),
-            "timestamp": json_transaction.get("timestamp", "2023-01-01T12:00:00Z"),
+            "id": get("transaction_id", "unknown"),
+            "timestamp": get("timestamp", "2023-01-01T12:00:00Z"),
             "merchant": {
-                "name": json_transaction.get("merchant_name", "Unknown"),
-                "category": json_transaction.get("merchant_category", "unknown"),
-                "location": {"lat": 0.0, "lng": 0.0},  # Default coordinates
+                "name": get("merchant_name", "Unknown"),
+                "category": get("merchant_category", "unknown"),
+                "location": fraud_detector.ML_DEFAULT_LOCATION,
             },
-            "amount": json_transaction.get("amount", 0.0),
+            "amount": get("amount", 0.0),
             "card": {
-                "number": json_transaction.get("card_number", "0000"),
-                "full": f"{json_transaction.get('card_number', '0000')}567890121234",
-            },
-            "account": {"number": "1234", "full": "1234567890123456"},
-        },
-        "model_features": {
-            "temporal": {
-                "trans_in_last_1h": 1.0,
-                "trans_in_last_24h": 3.0,
-                "trans_in_last_7d": 15.0,
-            },
-            "amount_ratios": {
-                "amt_per_card_avg_ratio_1h": 1.2,
-                "amt_per_card_avg_ratio_24h": 1.1,
-                "amt_per_card_avg_ratio_7d": 1.0,
-                "amt_per_category_avg_ratio_1h": 0.9,
-                "amt_per_category_avg_ratio_24h": 0.8,
-                "amt_per_category_avg_ratio_7d": 0.7,
+                "number": card_number,
+                "full": f"{card_number}{FeatureEngineer.DEFAULT_CARD_SUFFIX}",
             },
-            "deviations": {"amt_diff_from_card_median_7d": 50.0},
+            "account": fraud_detector.ML_DEFAULT_ACCOUNT,
         },
-        "ground_truth": {"is_fraud": False},  # Default, not used in prediction
+        "model_features": fraud_detector.ML_DEFAULT_MODEL_FEATURES,
+        "ground_truth": fraud_detector.ML_DEFAULT_GROUND_TRUTH,
     }
 
 
+@app.exception_handler(InferenceOverloadedError)
+async def inference_overloaded_handler(_, exc):
+    """Answer 503 when no inference slot frees up in time."""
+    logger.warning(f"Inference overloaded: {str(exc)}")
+    return Response(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=ErrorResponse(
+            error="Service Unavailable",
+            detail=str(exc),
+            timestamp=datetime.now(timezone.utc),
+        ).model_dump_json(),
+        media_type="application/json",
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(_, exc):
     """Global exception handler."""
     logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
-    return JSONResponse(
+    return Response(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content=ErrorResponse(
             error="Internal Server Error",
             detail=str(exc) if settings.debug else "An unexpected error occurred",
             timestamp=datetime.now(timezone.utc),
-        ).model_dump(),
+        ).model_dump_json(),
+        media_type="application/json",
     )
 
 
@@ -147,10 +260,10 @@ async def health_check():
     )
 
 
-@app.get("/")
-async def root():
-    """Root endpoint with API information."""
-    return {
+# Root endpoint body; settings and the OpenRouter client are fixed at import, so it
+# is serialized once
+ROOT_PAYLOAD = to_json(
+    {
         "name": settings.app_name,
         "version": settings.app_version,
         "status": "running",
@@ -172,6 +285,13 @@ async def root():
             "model": openrouter_service.model if openrouter_service.is_available() else None,
         },
     }
+)
+
+
+@app.get("/")
+async def root():
+    """Root endpoint with API information."""
+    return Response(content=ROOT_PAYLOAD, media_type="application/json")
 
 
 @app.post(
@@ -179,7 +299,7 @@ async def root():
     response_model=Union[FraudDetectionResponse, RefusalResponse],
     status_code=status.HTTP_200_OK,
 )
-async def analyze_transactions(batch: TransactionBatch, db: AsyncSession = Depends(get_db)):
+async def analyze_transactions(batch: TransactionBatch, background_tasks: BackgroundTasks):
     """
     Analyze a batch of credit card transactions for fraud.
 
@@ -198,13 +318,18 @@ async def analyze_transactions(batch: TransactionBatch, db: AsyncSession = Depen
     try:
         logger.info(f"Analyzing {len(batch.transactions)} transactions")
 
-        result = fraud_detector.analyze_transactions(batch.transactions)
+        # Model inference is CPU-bound, so run it off the event loop
+        async with inference_slot():
+            result = await asyncio.to_thread(
+                fraud_detector.analyze_transactions, batch.transactions
+            )
 
         if isinstance(result, RefusalResponse):
             logger.warning(f"Request refused: {result.reason}")
-            return JSONResponse(
+            return Response(
                 status_code=status.HTTP_403_FORBIDDEN,
-                content=result.model_dump(),
+                content=result.model_dump_json(),
+                media_type="application/json",
             )
 
         logger.info(
@@ -212,22 +337,19 @@ async def analyze_transactions(batch: TransactionBatch, db: AsyncSession = Depen
             f"{result.suspicious_count} suspicious, {result.legitimate_count} legitimate"
         )
 
-        # Persist results to database (non-blocking, log errors but don't fail)
-        try:
-            model_version = model_loader.version if model_loader.is_loaded else "unknown"
-            saved = await save_batch_analyses(
-                db,
-                result.analyses,
-                batch.transactions,
-                model_version,
-            )
-            logger.info(f"Saved {saved} analyses to database")
-        except Exception as db_error:
-            logger.error(f"Database save failed: {str(db_error)}", exc_info=True)
-            # Continue serving the response even if DB save fails
+        # Persist results to database after the response is sent; failures are only logged
+        model_version = model_loader.version if model_loader.is_loaded else "unknown"
+        background_tasks.add_task(
+            save_batch_analyses_in_background,
+            result.analyses,
+            [t.model_dump() for t in batch.transactions],
+            model_version,
+        )
 
         return result
 
+    except (HTTPException, InferenceOverloadedError):
+        raise
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(
@@ -247,9 +369,7 @@ async def analyze_transactions(batch: TransactionBatch, db: AsyncSession = Depen
     response_model=ModelPredictionResponse,
     status_code=status.HTTP_200_OK,
 )
-async def predict_with_ml_model(
-    request: ModelPredictionRequest, db: AsyncSession = Depends(get_db)
-):
+async def predict_with_ml_model(request: ModelPredictionRequest, background_tasks: BackgroundTasks):
     """
     Predict fraud using the trained XGBoost model.
 
@@ -268,20 +388,30 @@ async def predict_with_ml_model(
 
         # Convert transactions to ML model format
         ml_transactions = [convert_json_to_ml_format(txn) for txn in request.transactions]
+        cache_keys = [
+            tuple(txn.get(field) for field in ML_FORMAT_FIELDS) for txn in request.transactions
+        ]
 
-        # Get predictions from model service
-        analyses = model_service.predict_transactions(ml_transactions)
+        # Get predictions from model service, reusing cached analyses for repeats and
+        # sharing the model call with concurrent requests
+        analyses = await predict_batcher.predict(ml_transactions, cache_keys)
 
-        # Calculate summary statistics
+        # Calculate summary statistics in a single pass; enum members are singletons,
+        # so compare by identity
         total_transactions = len(analyses)
-        fraudulent_count = sum(1 for a in analyses if a.classification.value == "fraudulent")
-        suspicious_count = sum(1 for a in analyses if a.classification.value == "suspicious")
+        fraudulent_count = suspicious_count = 0
+        total_risk_score = 0.0
+        for a in analyses:
+            classification = a.classification
+            if classification is FraudClassification.FRAUDULENT:
+                fraudulent_count += 1
+            elif classification is FraudClassification.SUSPICIOUS:
+                suspicious_count += 1
+            total_risk_score += a.risk_score
         legitimate_count = total_transactions - fraudulent_count - suspicious_count
 
         # Calculate average risk score
-        average_risk_score = (
-            sum(a.risk_score for a in analyses) / total_transactions if analyses else 0.0
-        )
+        average_risk_score = total_risk_score / total_transactions if analyses else 0.0
 
         # Generate summary text
         summary = f"ML Model analyzed {total_transactions} transactions: "
@@ -291,10 +421,9 @@ async def predict_with_ml_model(
         # Get model info
         model_info = model_service.get_service_status()
 
-        # Convert analyses to dict format
-        analyses_dict = [a.model_dump() for a in analyses]
-
-        response = ModelPredictionResponse(
+        # Fields are built above from validated analyses, so skip constructor validation
+        # (its cost grows with the batch); the response_model check still runs on return
+        response = ModelPredictionResponse.model_construct(
             summary=summary,
             total_transactions=total_transactions,
             fraudulent_count=fraudulent_count,
@@ -302,13 +431,8 @@ async def predict_with_ml_model(
             legitimate_count=legitimate_count,
             average_risk_score=round(average_risk_score, 3),
             model_info=model_info,
-            analyses=analyses_dict,
-            citations=[
-                {
-                    "source": "XGBoost Fraud Detection Model",
-                    "url": "https://xgboost.readthedocs.io/en/stable/",
-                }
-            ],
+            analyses=analyses,
+            citations=ML_PREDICT_CITATIONS,
             warnings=[],
         )
 
@@ -317,21 +441,19 @@ async def predict_with_ml_model(
             f"{suspicious_count} suspicious, {legitimate_count} legitimate"
         )
 
-        # Persist results to database (non-blocking)
-        try:
-            model_version = model_loader.version if model_loader.is_loaded else "unknown"
-            saved = await save_batch_analyses(
-                db,
-                analyses,
-                request.transactions,
-                model_version,
-            )
-            logger.info(f"Saved {saved} ML predictions to database")
-        except Exception as db_error:
-            logger.error(f"Database save failed: {str(db_error)}", exc_info=True)
+        # Persist results to database after the response is sent
+        model_version = model_loader.version if model_loader.is_loaded else "unknown"
+        background_tasks.add_task(
+            save_batch_analyses_in_background,
+            analyses,
+            request.transactions,
+            model_version,
+        )
 
         return response
 
+    except (HTTPException, InferenceOverloadedError):
+        raise
     except Exception as e:
         logger.error(f"ML Model prediction failed: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -460,12 +582,9 @@ async def get_version():
         )
 
 
-@app.get("/api/schema")
-async def get_json_schema():
-    """
-    Get JSON schemas for request and response models.
-    """
-    return {
+# JSON schemas of the API models, generated and serialized once instead of per request
+SCHEMA_PAYLOAD = to_json(
+    {
         "transaction_batch": TransactionBatch.model_json_schema(),
         "fraud_detection_response": FraudDetectionResponse.model_json_schema(),
         "refusal_response": RefusalResponse.model_json_schema(),
@@ -474,6 +593,15 @@ async def get_json_schema():
         "pattern_analysis_request": PatternAnalysisRequest.model_json_schema(),
         "pattern_analysis_response": PatternAnalysisResponse.model_json_schema(),
     }
+)
+
+
+@app.get("/api/schema")
+async def get_json_schema():
+    """
+    Get JSON schemas for request and response models.
+    """
+    return Response(content=SCHEMA_PAYLOAD, media_type="application/json")
 
 
 @app.post(
@@ -537,6 +665,11 @@ async def explain_transaction_with_llm(request: LLMExplanationRequest):
         )
 
 
+# Columns read for /api/transactions/sample and the adapter that validates those rows
+SAMPLE_RESPONSE_FIELDS = tuple(EngineeredTransactionResponse.model_fields)
+sample_rows_adapter = TypeAdapter(List[EngineeredTransactionResponse])
+
+
 @app.get(
     "/api/transactions/sample",
     response_model=TransactionSampleResponse,
@@ -574,8 +707,10 @@ async def get_transaction_sample(
 
         logger.info(f"Fetching {limit} transactions for scenario '{scenario}'")
 
-        # Get transactions from database
-        transactions = await get_sample_transactions(db, scenario, limit)
+        # Get transactions from database, selecting only the columns the response carries
+        transactions = await get_sample_transactions(
+            db, scenario, limit, columns=SAMPLE_RESPONSE_FIELDS
+        )
 
         if not transactions:
             raise HTTPException(
@@ -583,39 +718,10 @@ async def get_transaction_sample(
                 detail=f"No transactions found for scenario '{scenario}'",
             )
 
-        # Convert to response model
-        transaction_responses = [
-            EngineeredTransactionResponse(
-                trans_num=t.trans_num,
-                is_fraud=t.is_fraud,
-                # Original transaction data
-                cc_num=t.cc_num,
-                acct_num=t.acct_num,
-                merchant=t.merchant,
-                category=t.category,
-                lat=t.lat,
-                long=t.long,
-                merch_lat=t.merch_lat,
-                merch_long=t.merch_long,
-                # Engineered features
-                amt=t.amt,
-                hour_of_day=t.hour_of_day,
-                is_late_night_fraud_window=t.is_late_night_fraud_window,
-                is_late_evening_fraud_window=t.is_late_evening_fraud_window,
-                log_trans_in_last_1h=t.log_trans_in_last_1h,
-                log_trans_in_last_24h=t.log_trans_in_last_24h,
-                log_trans_in_last_7d=t.log_trans_in_last_7d,
-                log_amt_per_card_avg_ratio_1h=t.log_amt_per_card_avg_ratio_1h,
-                log_amt_per_card_avg_ratio_24h=t.log_amt_per_card_avg_ratio_24h,
-                log_amt_per_card_avg_ratio_7d=t.log_amt_per_card_avg_ratio_7d,
-                log_amt_per_category_avg_ratio_1h=t.log_amt_per_category_avg_ratio_1h,
-                log_amt_per_category_avg_ratio_24h=t.log_amt_per_category_avg_ratio_24h,
-                log_amt_per_category_avg_ratio_7d=t.log_amt_per_category_avg_ratio_7d,
-                amt_diff_from_card_median_1d=t.amt_diff_from_card_median_1d,
-                amt_diff_from_card_median_7d=t.amt_diff_from_card_median_7d,
-            )
-            for t in transactions
-        ]
+        # Validate the rows into response models in one pydantic-core call
+        transaction_responses = sample_rows_adapter.validate_python(
+            transactions, from_attributes=True
+        )
 
         response = TransactionSampleResponse(
             transactions=transaction_responses,
@@ -716,19 +822,8 @@ async def analyze_transaction_patterns(request: PatternAnalysisRequest):
         )
 
         # Calculate statistics using service constants
-        high_risk_count = sum(
-            1 for p in request.predictions if p > openrouter_service.HIGH_RISK_THRESHOLD
-        )
-        medium_risk_count = sum(
-            1
-            for p in request.predictions
-            if openrouter_service.MEDIUM_RISK_THRESHOLD
-            <= p
-            <= openrouter_service.HIGH_RISK_THRESHOLD
-        )
-        low_risk_count = len(request.predictions) - high_risk_count - medium_risk_count
-        avg_risk = (
-            sum(request.predictions) / len(request.predictions) if request.predictions else 0.0
+        high_risk_count, medium_risk_count, low_risk_count, avg_risk = (
+            openrouter_service.summarize_predictions(request.predictions)
         )
 
         response = PatternAnalysisResponse(
@@ -758,4 +853,6 @@ async def analyze_transaction_patterns(request: PatternAnalysisRequest):
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop and httptools ship with uvicorn[standard]; name them so a missing install fails
+    # loudly instead of silently falling back to the pure-Python loop and parser
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
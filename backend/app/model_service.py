@@ -4,14 +4,22 @@ Coordinates model loading, feature engineering, and predictions.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Hashable, Optional
 import numpy as np
 import pandas as pd
 
+from app.config import settings
 from app.model_loader import model_loader
 from app.feature_engineering import feature_engineer
-from app.models import FraudAnalysis, FraudClassification, ShapFeatureExplanation
-from app.xai.shap_explainer import shap_explainer_service
+from app.models import (
+    FraudAnalysis,
+    FraudClassification,
+    ShapFeatureExplanation,
+    Transaction,
+)
+from app.xai.shap_explainer import ShapFeature, shap_explainer_service
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +30,14 @@ class ModelService:
     def __init__(self):
         """Initialize model service."""
         self._is_initialized = False
+        # Expected model feature names, cached at initialization for validate_features
+        self._expected_features: frozenset = frozenset()
+        # LRU cache of analyses for predict_transactions_cached, oldest first
+        self._prediction_cache: "OrderedDict[Hashable, FraudAnalysis]" = OrderedDict()
+        # Predictions run in worker threads; guards lazy initialization and the cache
+        self._lock = threading.Lock()
+        # Service status, fixed once the model is loaded; reset when artifacts reload
+        self._service_status: Optional[Dict[str, Any]] = None
 
     def initialize(self) -> bool:
         """
@@ -32,6 +48,10 @@ class ModelService:
         """
         try:
             logger.info("Initializing Model Service...")
+            self._service_status = None
+            # Reloaded artifacts may score differently, so cached analyses are stale
+            with self._lock:
+                self._prediction_cache.clear()
 
             # Load model artifacts
             success = model_loader.load_model_artifacts()
@@ -42,6 +62,7 @@ class ModelService:
 
             # Initialize SHAP explainer
             model_info = model_loader.get_model_info()
+            self._expected_features = frozenset(model_info.get("feature_names") or ())
             if model_info.get("feature_names") and model_loader._model is not None:
                 shap_success = shap_explainer_service.initialize(
                     model_loader._model, model_info["feature_names"]
@@ -74,60 +95,189 @@ class ModelService:
         Returns:
             List[FraudAnalysis]: Fraud analysis results for each transaction
         """
-        if not self._is_initialized:
-            if not self.initialize():
-                raise RuntimeError("Model service initialization failed")
+        self._ensure_initialized()
 
         try:
             # Step 1: Convert JSON to features
             logger.info(f"🔄 Processing {len(transactions)} transactions...")
-            X, y = feature_engineer.process_transactions(transactions)
+            df = feature_engineer.json_to_dataframe(transactions)
 
-            # Step 2: Validate features against expected model features
-            model_info = model_loader.get_model_info()
-            if model_info.get("feature_names"):
-                feature_engineer.validate_features(X, model_info["feature_names"])
-
-            # Step 3: Get predictions from model
-            logger.info("🤖 Running model predictions...")
-            probabilities, predictions = model_loader.predict_with_threshold(X.values)
-
-            # Step 4: Generate analysis results
-            results = []
-            for i, (tx, prob, pred) in enumerate(zip(transactions, probabilities, predictions)):
-                analysis = self._create_fraud_analysis(
-                    transaction=tx,
-                    probability=float(prob),
-                    binary_prediction=int(pred),
-                    feature_values=X.iloc[i].to_dict(),
-                    features_df=X.iloc[[i]],  # Single row DataFrame for SHAP
-                )
-                results.append(analysis)
+            return self._predict_dataframe(df)
+
+        except Exception as e:
+            logger.error(f"Prediction failed: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Prediction failed: {str(e)}")
+
+    def predict_transactions_cached(
+        self, transactions: List[Dict[str, Any]], cache_keys: List[Hashable]
+    ) -> List[FraudAnalysis]:
+        """
+        Predict fraud, serving repeated transactions from an in-process LRU cache.
+
+        Each row is scored independently of the rest of its batch, so analyses can be
+        reused per transaction; only the cache misses go through
+        ``predict_transactions``, as a single batch.
+
+        Args:
+            transactions: List of transaction dictionaries in JSON format
+            cache_keys: One key per transaction, covering every input that feeds the
+                model; transactions with unhashable keys are never cached
+
+        Returns:
+            List[FraudAnalysis]: Fraud analysis results for each transaction
+        """
+        cache = self._prediction_cache
+        results: List[Optional[FraudAnalysis]] = []
+        misses = []
+        with self._lock:
+            for i, key in enumerate(cache_keys):
+                try:
+                    cached = cache.get(key)
+                except TypeError:
+                    cached = None
+                if cached is None:
+                    misses.append(i)
+                else:
+                    cache.move_to_end(key)
+                results.append(cached)
+
+        if misses:
+            hits = len(results) - len(misses)
+            logger.info(f"Prediction cache: {hits} hits, {len(misses)} misses")
+            analyses = self.predict_transactions([transactions[i] for i in misses])
+
+            max_size = settings.prediction_cache_size
+            with self._lock:
+                for i, analysis in zip(misses, analyses):
+                    results[i] = analysis
+                    # Fallback analyses come from a failure, so they are not worth keeping
+                    if max_size <= 0 or analysis.classification is FraudClassification.UNKNOWN:
+                        continue
+                    try:
+                        cache[cache_keys[i]] = analysis
+                    except TypeError:
+                        continue
+                    if len(cache) > max_size:
+                        cache.popitem(last=False)
+
+        return results
+
+    def predict_api_transactions(self, transactions: List[Transaction]) -> List[FraudAnalysis]:
+        """
+        Predict fraud for validated API transactions.
+
+        Builds the feature DataFrame straight from the Transaction models, skipping
+        the nested JSON format used by ``predict_transactions``.
+
+        Args:
+            transactions: List of validated Transaction models
+
+        Returns:
+            List[FraudAnalysis]: Fraud analysis results for each transaction
+        """
+        self._ensure_initialized()
 
-            logger.info(f"Prediction complete: {len(results)} analyses generated")
+        try:
+            # Step 1: Convert transactions to features
+            logger.info(f"🔄 Processing {len(transactions)} transactions...")
+            df = feature_engineer.transactions_to_dataframe(transactions)
 
-            return results
+            return self._predict_dataframe(df)
 
         except Exception as e:
             logger.error(f"Prediction failed: {str(e)}", exc_info=True)
             raise RuntimeError(f"Prediction failed: {str(e)}")
 
+    def _ensure_initialized(self) -> None:
+        """Load model artifacts on first use."""
+        if not self._is_initialized:
+            with self._lock:
+                if not self._is_initialized and not self.initialize():
+                    raise RuntimeError("Model service initialization failed")
+
+    def _predict_dataframe(self, df: pd.DataFrame) -> List[FraudAnalysis]:
+        """
+        Run feature preparation, the model and analysis generation over a batch.
+
+        Args:
+            df: Transaction DataFrame from the feature engineer
+
+        Returns:
+            List[FraudAnalysis]: Fraud analysis results for each row of ``df``
+        """
+        X, y = feature_engineer.prepare_features(df)
+
+        # Step 2: Validate features against expected model features
+        if self._expected_features:
+            feature_engineer.validate_features(X, self._expected_features)
+
+        # Step 3: Get predictions from model
+        # XGBoost works in float32 internally, so hand it float32 directly; X keeps
+        # float64 for the feature values reported in analyses and SHAP output
+        logger.info("🤖 Running model predictions...")
+        probabilities, predictions = model_loader.predict_with_threshold(
+            X.to_numpy(dtype=np.float32)
+        )
+
+        # Step 4: Generate analysis results
+        # SHAP values and per-row feature values are computed for the whole batch up
+        # front rather than slicing X once per transaction
+        feature_names = list(X.columns)
+        feature_rows = X.to_numpy(dtype=np.float64).tolist()
+        if shap_explainer_service.is_initialized:
+            shap_batch = shap_explainer_service.get_shap_explanations(X, top_n=4)
+        else:
+            shap_batch = [None] * len(feature_rows)
+
+        # Transaction id, amount and merchant are read back from the ID columns of
+        # df, which prepare_features leaves in place
+        results = []
+        rows = zip(
+            df["trans_num"],
+            df["amt"],
+            df["merchant"],
+            probabilities,
+            predictions,
+            feature_rows,
+            shap_batch,
+        )
+        for transaction_id, amount, merchant_name, prob, pred, values, shap_features in rows:
+            analysis = self._create_fraud_analysis(
+                transaction_id=transaction_id,
+                amount=amount,
+                merchant_name=merchant_name,
+                probability=float(prob),
+                binary_prediction=int(pred),
+                feature_values=dict(zip(feature_names, values)),
+                shap_features=shap_features,
+            )
+            results.append(analysis)
+
+        logger.info(f"Prediction complete: {len(results)} analyses generated")
+
+        return results
+
     def _create_fraud_analysis(
         self,
-        transaction: Dict[str, Any],
+        transaction_id: str,
+        amount: float,
+        merchant_name: str,
         probability: float,
         binary_prediction: int,
         feature_values: Dict[str, float],
-        features_df: Optional[pd.DataFrame] = None,
+        shap_features: Optional[List[ShapFeature]] = None,
     ) -> FraudAnalysis:
         """
         Create a FraudAnalysis object from prediction results.
 
         Args:
-            transaction: Original transaction data
+            transaction_id: Transaction identifier
+            amount: Transaction amount
+            merchant_name: Merchant name
             probability: Fraud probability [0.0, 1.0]
             binary_prediction: Binary prediction (0 or 1)
             feature_values: Feature values used for prediction
+            shap_features: Top SHAP features for this transaction, if available
 
         Returns:
             FraudAnalysis: Fraud analysis result
@@ -147,16 +297,10 @@ class ModelService:
             # Generate legacy risk factors based on feature analysis
             risk_factors = self._analyze_risk_factors(feature_values, probability)
 
-            # Get transaction data first
-            tx_data = transaction["transaction"]
-
             # Generate SHAP-based explanations if available
             shap_explanations = []
-            if features_df is not None and shap_explainer_service.is_initialized:
+            if shap_features is not None:
                 try:
-                    shap_features = shap_explainer_service.get_shap_explanation(
-                        features_df, top_n=4
-                    )
                     shap_explanations = [
                         ShapFeatureExplanation(
                             feature_name=sf.feature_name,
@@ -170,20 +314,20 @@ class ModelService:
                         for sf in shap_features
                     ]
                     logger.debug(
-                        f"Generated {len(shap_explanations)} SHAP explanations for transaction {tx_data['id']}"
+                        f"Generated {len(shap_explanations)} SHAP explanations for transaction {transaction_id}"
                     )
                 except Exception as e:
                     logger.warning(
-                        f"SHAP explanation generation failed for transaction {tx_data['id']}: {str(e)}"
+                        f"SHAP explanation generation failed for transaction {transaction_id}: {str(e)}"
                     )
 
             # Generate explanation
             explanation = self._generate_explanation(
-                tx_data, probability, classification_text, risk_factors
+                amount, merchant_name, probability, classification_text, risk_factors
             )
 
             return FraudAnalysis(
-                transaction_id=tx_data["id"],
+                transaction_id=transaction_id,
                 classification=classification,
                 risk_score=round(probability, 3),
                 risk_factors=risk_factors,
@@ -195,7 +339,7 @@ class ModelService:
             logger.error(f"❌ Failed to create fraud analysis: {str(e)}")
             # Return a fallback analysis
             return FraudAnalysis(
-                transaction_id=transaction["transaction"]["id"],
+                transaction_id=transaction_id,
                 classification=FraudClassification.UNKNOWN,
                 risk_score=0.5,
                 risk_factors=["Analysis failed"],
@@ -263,7 +407,8 @@ class ModelService:
 
     def _generate_explanation(
         self,
-        transaction_data: Dict[str, Any],
+        amount: float,
+        merchant: str,
         probability: float,
         classification: str,
         risk_factors: List[str],
@@ -272,7 +417,8 @@ class ModelService:
         Generate human-readable explanation for the fraud prediction.
 
         Args:
-            transaction_data: Transaction information
+            amount: Transaction amount
+            merchant: Merchant name
             probability: Fraud probability
             classification: Classification result
             risk_factors: List of risk factors
@@ -281,23 +427,18 @@ class ModelService:
             str: Human-readable explanation
         """
         try:
-            amount = transaction_data["amount"]
-            merchant = transaction_data["merchant"]["name"]
-
             # Create base explanation
-            explanation = f"This ${amount:.2f} transaction at {merchant} is classified as "
-            explanation += f"{classification.upper()} (risk score: {probability:.1%}). "
+            explanation = (
+                f"This ${amount:.2f} transaction at {merchant} is classified as "
+                f"{classification.upper()} (risk score: {probability:.1%}). "
+            )
 
             # Add risk factors with better formatting
-            if risk_factors:
-                if len(risk_factors) == 1:
-                    explanation += f"Key concern: {risk_factors[0]}."
-                else:
-                    explanation += "\n\nKey concerns:\n"
-                    for i, factor in enumerate(risk_factors, 1):
-                        explanation += f"• {factor}\n"
-                    # Remove the last newline
-                    explanation = explanation.rstrip()
+            if len(risk_factors) == 1:
+                explanation += f"Key concern: {risk_factors[0]}."
+            elif risk_factors:
+                explanation += "\n\nKey concerns:\n• " + "\n• ".join(risk_factors)
+                explanation = explanation.rstrip()
 
             return explanation
 
@@ -306,12 +447,23 @@ class ModelService:
             return f"Transaction classified as {classification} with {probability:.1%} fraud probability."
 
     def get_service_status(self) -> Dict[str, Any]:
-        """Get the current status of the model service."""
-        return {
+        """
+        Get the current status of the model service.
+
+        The returned dict is shared between callers once the model is loaded, so
+        treat it as read-only.
+        """
+        if self._service_status is not None:
+            return self._service_status
+
+        service_status = {
             "initialized": self._is_initialized,
             "model_loaded": model_loader.is_loaded,
             "model_info": model_loader.get_model_info() if model_loader.is_loaded else {},
         }
+        if self._is_initialized and model_loader.is_loaded:
+            self._service_status = service_status
+        return service_status
 
     def health_check(self) -> bool:
         """Perform a health check on the model service."""
@@ -96,6 +96,8 @@ class FraudAnalysis(BaseModel):
 class Citation(BaseModel):
     """Citation for fraud detection sources."""
 
+    model_config = ConfigDict(frozen=True)
+
     source: str = Field(..., min_length=1, max_length=500)
     url: Optional[str] = Field(None, max_length=1000)
 
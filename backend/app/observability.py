@@ -15,6 +15,16 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Constant, probe-style endpoints that would cost as much to trace as to serve; matched
+# against the full request URL
+UNTRACED_URLS = ",".join(
+    [
+        r"://[^/]+/$",
+        r"://[^/]+/health$",
+        r"://[^/]+/api/schema$",
+    ]
+)
+
 
 def setup_observability():
     """Initialize OpenTelemetry tracing."""
@@ -34,5 +44,5 @@ def setup_observability():
 def instrument_app(app):
     """Instrument FastAPI app with OpenTelemetry."""
     if settings.otel_enabled:
-        FastAPIInstrumentor.instrument_app(app)
+        FastAPIInstrumentor.instrument_app(app, excluded_urls=UNTRACED_URLS)
         logger.info("FastAPI instrumented with OpenTelemetry")
@@ -1,8 +1,12 @@
 """OpenRouter LLM service for transaction explanation and analysis."""
 
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
-from openai import OpenAI
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+from openai import AsyncOpenAI
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -17,12 +21,19 @@ class OpenRouterService:
 
     def __init__(self):
         """Initialize OpenRouter service with API key."""
+        # LRU of prompt -> (expires_at, response); the prompt holds every input to the LLM
+        self._completion_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # Running LLM calls by prompt, so identical concurrent requests share one call
+        self._completions_in_flight: Dict[str, "asyncio.Task[str]"] = {}
+
         if not settings.open_router_key:
             logger.warning("OpenRouter API key not configured")
             self.client = None
             return
 
-        self.client = OpenAI(
+        # One async client for the whole process, so calls reuse its pooled keep-alive
+        # connections instead of paying a TLS handshake each time
+        self.client = AsyncOpenAI(
             base_url="https://openrouter.ai/api/v1",
             api_key=settings.open_router_key,
         )
@@ -33,6 +44,11 @@ class OpenRouterService:
         """Check if OpenRouter service is available."""
         return self.client is not None
 
+    async def close(self) -> None:
+        """Close the pooled HTTP connections of the LLM client."""
+        if self.client is not None:
+            await self.client.close()
+
     async def explain_fraud_prediction(
         self,
         transaction_data: Dict[str, Any],
@@ -61,17 +77,9 @@ class OpenRouterService:
                 transaction_data, fraud_probability, risk_factors, model_features
             )
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.3,
-                max_tokens=500,
+            explanation = await self._complete(
+                prompt, self._get_system_prompt(), temperature=0.3, max_tokens=500
             )
-
-            explanation = response.choices[0].message.content.strip()
             logger.info(
                 f"Generated explanation for transaction {transaction_data.get('transaction_id', 'unknown')}"
             )
@@ -100,20 +108,13 @@ class OpenRouterService:
         try:
             prompt = self._build_pattern_analysis_prompt(transactions, predictions)
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert fraud analyst. Analyze transaction patterns and provide insights.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+            analysis = await self._complete(
+                prompt,
+                "You are an expert fraud analyst. "
+                "Analyze transaction patterns and provide insights.",
                 temperature=0.2,
                 max_tokens=800,
             )
-
-            analysis = response.choices[0].message.content.strip()
             logger.info(f"Generated pattern analysis for {len(transactions)} transactions")
             return analysis
 
@@ -121,6 +122,83 @@ class OpenRouterService:
             logger.error(f"Error generating pattern analysis: {str(e)}")
             return f"Unable to analyze patterns: {str(e)}"
 
+    async def _complete(
+        self, prompt: str, system_prompt: str, temperature: float, max_tokens: int
+    ) -> str:
+        """
+        Get the LLM answer to a prompt, reusing cached answers and identical running calls.
+
+        Each kind of request has a fixed system prompt and settings, and the user prompts
+        of different kinds never coincide, so the user prompt alone keys the cache.
+
+        Args:
+            prompt: User prompt holding every request-specific input
+            system_prompt: System prompt for this kind of request
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Response text
+        """
+        cached = self._get_cached_completion(prompt)
+        if cached is not None:
+            logger.info("Reused cached LLM response")
+            return cached
+
+        task = self._completions_in_flight.get(prompt)
+        if task is None:
+            task = asyncio.create_task(
+                self._request_completion(prompt, system_prompt, temperature, max_tokens)
+            )
+            self._completions_in_flight[prompt] = task
+            task.add_done_callback(lambda _: self._completions_in_flight.pop(prompt, None))
+        else:
+            logger.info("Joined in-flight LLM request")
+
+        # Shielded so one caller disconnecting does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _request_completion(
+        self, prompt: str, system_prompt: str, temperature: float, max_tokens: int
+    ) -> str:
+        """Call the LLM and cache its answer."""
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+
+        text = response.choices[0].message.content.strip()
+        self._cache_completion(prompt, text)
+        return text
+
+    def _get_cached_completion(self, prompt: str) -> Optional[str]:
+        """Return a cached, unexpired answer for this prompt, if any."""
+        entry = self._completion_cache.get(prompt)
+        if entry is None:
+            return None
+        expires_at, text = entry
+        if time.monotonic() >= expires_at:
+            del self._completion_cache[prompt]
+            return None
+        self._completion_cache.move_to_end(prompt)
+        return text
+
+    def _cache_completion(self, prompt: str, text: str) -> None:
+        """Store an LLM answer, evicting the least recently used entry when full."""
+        max_size = settings.llm_cache_size
+        if max_size <= 0:
+            return
+        cache = self._completion_cache
+        cache[prompt] = (time.monotonic() + settings.llm_cache_ttl_seconds, text)
+        cache.move_to_end(prompt)
+        if len(cache) > max_size:
+            cache.popitem(last=False)
+
     def _get_system_prompt(self) -> str:
         """Get system prompt for fraud explanation."""
         return """You are an expert fraud detection analyst. Your job is to explain fraud predictions in clear, professional language that both technical and non-technical users can understand.
@@ -195,26 +273,51 @@ Please provide a clear, professional explanation of why this transaction was fla
         else:
             return "LOW"
 
+    def summarize_predictions(self, predictions: List[float]) -> Tuple[int, int, int, float]:
+        """
+        Bucket fraud probabilities by risk level in one vectorized pass.
+
+        Args:
+            predictions: Fraud probabilities, one per transaction
+
+        Returns:
+            tuple: (high_risk_count, medium_risk_count, low_risk_count, average_risk)
+        """
+        # float64 keeps the threshold comparisons identical to comparing Python floats
+        preds = np.asarray(predictions, dtype=np.float64)
+        if preds.size == 0:
+            return 0, 0, 0, 0.0
+
+        high_risk_count = int(np.count_nonzero(preds > self.HIGH_RISK_THRESHOLD))
+        # Medium is MEDIUM_RISK_THRESHOLD <= p <= HIGH_RISK_THRESHOLD
+        medium_risk_count = (
+            int(np.count_nonzero(preds >= self.MEDIUM_RISK_THRESHOLD)) - high_risk_count
+        )
+        low_risk_count = preds.size - high_risk_count - medium_risk_count
+        # sum() adds in list order, so the average rounds exactly as before; np.mean's
+        # pairwise summation can differ in the last bits
+        return high_risk_count, medium_risk_count, low_risk_count, sum(predictions) / preds.size
+
     def _build_pattern_analysis_prompt(
         self, transactions: List[Dict[str, Any]], predictions: List[float]
     ) -> str:
         """Build prompt for pattern analysis."""
 
         # Calculate summary statistics
-        high_risk_count = sum(1 for p in predictions if p > self.HIGH_RISK_THRESHOLD)
-        medium_risk_count = sum(
-            1 for p in predictions if self.MEDIUM_RISK_THRESHOLD <= p <= self.HIGH_RISK_THRESHOLD
+        high_risk_count, medium_risk_count, low_risk_count, avg_risk = self.summarize_predictions(
+            predictions
         )
-        low_risk_count = len(predictions) - high_risk_count - medium_risk_count
-        avg_risk = sum(predictions) / len(predictions) if predictions else 0
 
-        # Get sample of high-risk transactions
+        # Get sample of high-risk transactions, stopping once three are found
+        high_risk_threshold = self.HIGH_RISK_THRESHOLD
         high_risk_samples = []
-        for i, (tx, pred) in enumerate(zip(transactions, predictions)):
-            if pred > self.HIGH_RISK_THRESHOLD and len(high_risk_samples) < 3:
+        for tx, pred in zip(transactions, predictions):
+            if pred > high_risk_threshold:
                 high_risk_samples.append(
                     f"- ${tx.get('amount', 'N/A')} at {tx.get('merchant_name', 'N/A')} ({pred:.2%} risk)"
                 )
+                if len(high_risk_samples) == 3:
+                    break
 
         prompt = f"""Analyze the following batch of {len(transactions)} transactions:
 
@@ -0,0 +1,134 @@
+"""Micro-batching of concurrent prediction requests into shared model batches."""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable, List, Optional, Set, Tuple
+
+from app.models import FraudAnalysis
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceOverloadedError(Exception):
+    """Raised by a batch runner when no inference capacity frees up in time."""
+
+
+# Runs one model batch: (transactions, cache_keys) -> one analysis per transaction
+BatchRunner = Callable[[List[Any], List[Hashable]], Awaitable[List[FraudAnalysis]]]
+
+
+class PredictionBatcher:
+    """
+    Coalesce concurrent prediction requests into one model call.
+
+    Every model call pays a fixed cost (DataFrame assembly, XGBoost and SHAP setup)
+    on top of the per-transaction work, so requests that arrive within
+    ``max_wait_seconds`` of each other are scored together and each caller gets back
+    its own slice of the results.
+    """
+
+    def __init__(self, run_batch: BatchRunner, max_batch_size: int, max_wait_seconds: float):
+        """
+        Initialize the batcher.
+
+        Args:
+            run_batch: Coroutine function that scores one merged batch
+            max_batch_size: Transactions at which a batch is sent without waiting
+            max_wait_seconds: How long the first request waits for others; 0 disables
+                batching
+        """
+        self._run_batch = run_batch
+        self._max_batch_size = max_batch_size
+        self._max_wait_seconds = max_wait_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[List[Any], List[Hashable], asyncio.Future]] = []
+        self._pending_size = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Keeps running batches referenced until they finish
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def predict(
+        self, transactions: List[Any], cache_keys: List[Hashable]
+    ) -> List[FraudAnalysis]:
+        """
+        Predict fraud for one request, sharing the model call with concurrent requests.
+
+        Args:
+            transactions: Transactions of this request
+            cache_keys: One prediction cache key per transaction
+
+        Returns:
+            List[FraudAnalysis]: Fraud analysis results for each transaction
+        """
+        if self._max_wait_seconds <= 0:
+            return await self._run_batch(transactions, cache_keys)
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Batches never span event loops
+            self._loop = loop
+            self._pending, self._pending_size, self._flush_handle = [], 0, None
+
+        future = loop.create_future()
+        self._pending.append((transactions, cache_keys, future))
+        self._pending_size += len(transactions)
+        if self._pending_size >= self._max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._max_wait_seconds, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Send the pending requests to the model as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending, self._pending_size = self._pending, [], 0
+        task = self._loop.create_task(self._execute(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, batch: List[Tuple[List[Any], List[Hashable], asyncio.Future]]) -> None:
+        """Score a merged batch and hand each request its slice of the results."""
+        if len(batch) == 1:
+            await self._resolve(*batch[0])
+            return
+
+        transactions = [txn for txns, _, _ in batch for txn in txns]
+        cache_keys = [key for _, keys, _ in batch for key in keys]
+        logger.info(f"Micro-batching {len(batch)} requests into {len(transactions)} transactions")
+        try:
+            analyses = await self._run_batch(transactions, cache_keys)
+        except InferenceOverloadedError as e:
+            # An overloaded server refuses every request alike, so don't retry them
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except Exception as e:
+            # One malformed request must not fail the others, so score each on its own
+            logger.warning(f"Batched prediction failed, retrying requests separately: {str(e)}")
+            await asyncio.gather(*(self._resolve(*item) for item in batch))
+            return
+
+        start = 0
+        for txns, _, future in batch:
+            end = start + len(txns)
+            if not future.done():
+                future.set_result(analyses[start:end])
+            start = end
+
+    async def _resolve(
+        self, transactions: List[Any], cache_keys: List[Hashable], future: asyncio.Future
+    ) -> None:
+        """Score a single request and settle its future."""
+        try:
+            result = await self._run_batch(transactions, cache_keys)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
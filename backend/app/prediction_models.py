@@ -6,6 +6,8 @@ from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from app.models import FraudAnalysis
+
 
 class ModelPredictionRequest(BaseModel):
     """Request model for ML model predictions."""
@@ -28,7 +30,7 @@ class ModelPredictionResponse(BaseModel):
     legitimate_count: int = Field(..., ge=0)
     average_risk_score: float = Field(..., ge=0.0, le=1.0)
     model_info: Dict[str, Any]
-    analyses: List[Dict[str, Any]]  # FraudAnalysis objects serialized
+    analyses: List[FraudAnalysis]
     citations: List[Dict[str, Any]] = Field(default_factory=list)
     warnings: List[str] = Field(default_factory=list)
 
@@ -112,6 +112,71 @@ class ShapExplainerService:
             logger.error(f"SHAP explanation generation failed: {str(e)}", exc_info=True)
             return []
 
+    def get_shap_explanations(
+        self, features: pd.DataFrame, top_n: int = 4
+    ) -> List[List[ShapFeature]]:
+        """
+        Get SHAP-based explanations for every transaction in a batch.
+
+        SHAP values for the whole feature matrix come from a single explainer call
+        instead of one call (and one DMatrix) per transaction.
+
+        Args:
+            features: Feature DataFrame, one row per transaction
+            top_n: Number of top features to return per transaction
+
+        Returns:
+            List[List[ShapFeature]]: Top contributing features for each row of ``features``
+        """
+        if not self._is_initialized or self._explainer is None:
+            logger.error("SHAP explainer not initialized")
+            return [[] for _ in range(len(features))]
+
+        try:
+            shap_values = self._explainer.shap_values(features)
+
+            # For binary classification, shap_values is a single array
+            if isinstance(shap_values, list):
+                shap_values = shap_values[1]  # Use positive class (fraud)
+
+            shap_values = np.asarray(shap_values).reshape(len(features), -1)
+            feature_values = features.to_numpy(dtype=np.float64)
+
+        except Exception as e:
+            logger.error(f"SHAP explanation generation failed: {str(e)}", exc_info=True)
+            return [[] for _ in range(len(features))]
+
+        feature_names = list(features.columns)
+        explanations = []
+        for row_shap, row_values in zip(shap_values, feature_values):
+            try:
+                explanations.append(
+                    [
+                        self._convert_to_human_explanation(
+                            feature_names[i], float(row_values[i]), float(row_shap[i])
+                        )
+                        for i in self._top_feature_indices(row_shap, top_n)
+                    ]
+                )
+            except Exception as e:
+                logger.error(f"SHAP explanation generation failed: {str(e)}", exc_info=True)
+                explanations.append([])
+
+        logger.info(f"Generated SHAP explanations for {len(explanations)} transactions")
+        return explanations
+
+    @staticmethod
+    def _top_feature_indices(shap_values: np.ndarray, top_n: int) -> np.ndarray:
+        """
+        Indices of the ``top_n`` features with the largest absolute SHAP value.
+
+        Ties are ordered as ``DataFrame.sort_values(key=abs, ascending=False)`` orders
+        them in get_shap_explanation, so both methods pick the same features.
+        """
+        abs_values = np.abs(shap_values)
+        reversed_order = abs_values[::-1].argsort(kind="quicksort")
+        return (len(abs_values) - 1 - reversed_order)[::-1][:top_n]
+
     def _convert_to_human_explanation(
         self, feature_name: str, feature_value: float, shap_value: float
     ) -> ShapFeature:
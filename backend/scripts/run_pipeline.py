@@ -1,6 +1,7 @@
 import asyncio
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from app.config import settings
+from app.db_models import EngineeredTransaction
 from scripts.seed_utils import merge_sparkov_csvs
 from app.preprocess.feature_engineering import FeatureEngineer
 
@@ -21,6 +22,12 @@ async def main():
     # Load into the engineered table for the model
     engineered_df.to_sql("engineered_transactions", con=engine, if_exists="replace", index=False)
 
+    # Replacing the table drops its indexes, so recreate them and refresh planner stats
+    for index in EngineeredTransaction.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE engineered_transactions"))
+
     print(f"Success! {len(engineered_df)} model-ready transactions seeded.")
 
 if __name__ == "__main__":
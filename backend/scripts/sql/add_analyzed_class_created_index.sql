@@ -0,0 +1,10 @@
+-- Brings an existing analyzed_transactions table in line with db_models.AnalyzedTransaction.
+-- create_all only adds indexes when it creates the table, so databases created before
+-- ix_analyzed_class_created was declared need this once. CONCURRENTLY keeps the table
+-- writable while the index builds; run it outside a transaction (psql -f does).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_analyzed_class_created
+    ON analyzed_transactions (classification, created_at DESC);
+
+-- The composite index leads with classification, so the old single-column index is redundant
+DROP INDEX CONCURRENTLY IF EXISTS ix_analyzed_transactions_classification;
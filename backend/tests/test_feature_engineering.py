@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for the feature engineering conversions.
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add the backend directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.feature_engineering import feature_engineer
+from app.main import convert_json_to_ml_format
+from app.models import Transaction
+
+
+def test_full_card_number_does_not_overflow():
+    """A full card number plus the placeholder suffix is wider than int64."""
+    transaction = convert_json_to_ml_format(
+        {
+            "transaction_id": "PAN_001",
+            "timestamp": "2024-03-01T10:00:00Z",
+            "merchant_name": "Shop",
+            "merchant_category": "travel",
+            "amount": 42.0,
+            "card_number": "4111111111111111",
+        }
+    )
+
+    df = feature_engineer.json_to_dataframe([transaction])
+
+    assert len(df) == 1
+    assert df["cc_num"].iloc[0] == "4111111111111111567890121234"
+    X, _ = feature_engineer.prepare_features(df)
+    assert "cc_num" not in X.columns
+
+
+def test_json_and_model_paths_share_placeholders():
+    """The JSON format and the Transaction path fill in the same placeholder features."""
+    fields = {
+        "transaction_id": "TXN_001",
+        "timestamp": "2024-03-01T23:30:00+00:00",
+        "merchant_name": "Shop",
+        "merchant_category": "travel",
+        "amount": 42.0,
+        "card_number": "1234",
+    }
+    from_json = feature_engineer.json_to_dataframe([convert_json_to_ml_format(fields)])
+    from_model = feature_engineer.transactions_to_dataframe(
+        [Transaction(**fields, location="Berlin")]
+    )
+
+    assert from_json["cc_num"].iloc[0] == from_model["cc_num"].iloc[0]
+    assert int(from_json["acct_num"].iloc[0]) == from_model["acct_num"].iloc[0]
+    X_json, _ = feature_engineer.prepare_features(from_json)
+    X_model, _ = feature_engineer.prepare_features(from_model)
+    pd.testing.assert_frame_equal(X_json, X_model, check_dtype=False)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Tests for caching and sharing of LLM answers in the OpenRouter service.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add the backend directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import openrouter_service as openrouter_module
+from app.config import settings
+from app.openrouter_service import OpenRouterService
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions, counting calls per prompt."""
+
+    def __init__(self):
+        self.calls = []
+        self.fail = False
+        # When set, calls wait for it, so they stay in flight
+        self.release = None
+
+    async def create(self, model, messages, temperature, max_tokens):
+        prompt = messages[-1]["content"]
+        self.calls.append(prompt)
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail:
+            raise RuntimeError("upstream error")
+        message = SimpleNamespace(content=f" answer {len(self.calls)} ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic clock for the service module."""
+    now = [1000.0]
+    monkeypatch.setattr(openrouter_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def cache_settings():
+    """Set the LLM cache size and TTL for one test."""
+    original = settings.llm_cache_size, settings.llm_cache_ttl_seconds
+
+    def configure(size: int, ttl: float = 60.0) -> None:
+        object.__setattr__(settings, "llm_cache_size", size)
+        object.__setattr__(settings, "llm_cache_ttl_seconds", ttl)
+
+    configure(16)
+    yield configure
+    configure(*original)
+
+
+@pytest.fixture
+def service(cache_settings):
+    """OpenRouter service with its LLM client replaced by a fake."""
+    service = OpenRouterService()
+    service.completions = FakeCompletions()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=service.completions))
+    service.model = "test-model"
+    return service
+
+
+async def explain(service, transaction_id):
+    """Ask for the explanation of one transaction; the id sets the prompt."""
+    return await service.explain_fraud_prediction(
+        {"transaction_id": transaction_id, "amount": 10.0}, 0.9, ["High amount"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_repeated_prompt_is_served_from_cache(service, clock):
+    """The same prompt within the TTL reuses the first answer."""
+    first = await explain(service, "T1")
+    second = await explain(service, "T1")
+
+    assert first == second == "answer 1"
+    assert len(service.completions.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_answer_is_requested_again(service, clock, cache_settings):
+    """An answer older than the TTL is dropped and the LLM is called again."""
+    cache_settings(16, ttl=60.0)
+    await explain(service, "T1")
+    clock[0] += 60.0
+
+    assert await explain(service, "T1") == "answer 2"
+    assert len(service.completions.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_answer_is_evicted(service, clock, cache_settings):
+    """A full cache drops the answer used least recently."""
+    cache_settings(2)
+    await explain(service, "T1")
+    await explain(service, "T2")
+    await explain(service, "T1")  # T2 is now the oldest
+    await explain(service, "T3")
+    calls = len(service.completions.calls)
+
+    await explain(service, "T1")
+    assert len(service.completions.calls) == calls
+    await explain(service, "T2")
+    assert len(service.completions.calls) == calls + 1
+
+
+@pytest.mark.asyncio
+async def test_size_zero_disables_the_cache(service, clock, cache_settings):
+    """With size 0 every request reaches the LLM."""
+    cache_settings(0)
+    await explain(service, "T1")
+    await explain(service, "T1")
+
+    assert len(service.completions.calls) == 2
+    assert not service._completion_cache
+
+
+@pytest.mark.asyncio
+async def test_failures_are_not_cached(service, clock):
+    """A failed call returns the fallback text and the next request retries."""
+    service.completions.fail = True
+    assert (await explain(service, "T1")).startswith("Unable to generate explanation")
+
+    service.completions.fail = False
+    assert await explain(service, "T1") == "answer 2"
+    assert len(service.completions.calls) == 2
+
+
+async def start_in_flight(service, count):
+    """Start identical requests and let them reach the held LLM call."""
+    service.completions.release = asyncio.Event()
+    tasks = [asyncio.create_task(explain(service, "T1")) for _ in range(count)]
+    for _ in range(5):
+        await asyncio.sleep(0)
+    return tasks
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call(service, clock):
+    """Identical requests made while a call runs wait for it instead of calling again."""
+    tasks = await start_in_flight(service, 3)
+    assert len(service.completions.calls) == 1
+
+    service.completions.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert results == ["answer 1"] * 3
+    assert len(service.completions.calls) == 1
+    assert not service._completions_in_flight
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_shared_call(service, clock):
+    """One caller going away leaves the call running for the others."""
+    first, second = await start_in_flight(service, 2)
+    first.cancel()
+    await asyncio.sleep(0)
+
+    service.completions.release.set()
+
+    assert await second == "answer 1"
+    assert first.cancelled()
+    assert len(service.completions.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_call_is_removed_from_in_flight(service, clock):
+    """Every waiter gets the failure, and the next request starts a new call."""
+    service.completions.fail = True
+    tasks = await start_in_flight(service, 2)
+    service.completions.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert all(result.startswith("Unable to generate explanation") for result in results)
+    assert not service._completions_in_flight
+
+    service.completions.fail = False
+    assert await explain(service, "T1") == "answer 2"
+    assert len(service.completions.calls) == 2
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for micro-batching of concurrent prediction requests.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the backend directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import main
+from app.prediction_batcher import InferenceOverloadedError, PredictionBatcher
+
+
+class RecordingRunner:
+    """Batch runner that scores each transaction by name and records every call."""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    async def __call__(self, transactions, cache_keys):
+        self.calls.append(list(transactions))
+        if self.error is not None:
+            raise self.error
+        if "bad" in transactions:
+            raise ValueError("malformed transaction")
+        return [f"scored:{txn}" for txn in transactions]
+
+
+REQUESTS = [["a1", "a2"], ["b1"], ["c1", "c2", "c3"]]
+
+
+async def predict_concurrently(batcher, requests):
+    """Send every request at once and collect results or exceptions."""
+    return await asyncio.gather(
+        *(batcher.predict(txns, list(txns)) for txns in requests), return_exceptions=True
+    )
+
+
+@pytest.mark.asyncio
+async def test_merged_batch_matches_sequential_scoring():
+    """Concurrent requests share one call and each gets back its own slice."""
+    runner = RecordingRunner()
+    batcher = PredictionBatcher(runner, max_batch_size=100, max_wait_seconds=0.01)
+
+    results = await predict_concurrently(batcher, REQUESTS)
+
+    assert runner.calls == [[txn for txns in REQUESTS for txn in txns]]
+    sequential = [await RecordingRunner()(txns, txns) for txns in REQUESTS]
+    assert results == sequential
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting():
+    """Reaching max_batch_size flushes before the wait expires."""
+    runner = RecordingRunner()
+    batcher = PredictionBatcher(runner, max_batch_size=3, max_wait_seconds=60)
+
+    results = await asyncio.wait_for(predict_concurrently(batcher, REQUESTS[:2]), timeout=1)
+
+    assert results == [["scored:a1", "scored:a2"], ["scored:b1"]]
+    assert len(runner.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_malformed_request_does_not_fail_the_others():
+    """A failing merged batch is retried per request, so only the bad one fails."""
+    runner = RecordingRunner()
+    batcher = PredictionBatcher(runner, max_batch_size=100, max_wait_seconds=0.01)
+
+    good, bad, other = await predict_concurrently(batcher, [["a1"], ["bad"], ["c1", "c2"]])
+
+    assert good == ["scored:a1"]
+    assert isinstance(bad, ValueError)
+    assert other == ["scored:c1", "scored:c2"]
+
+
+@pytest.mark.asyncio
+async def test_overload_reaches_every_waiter():
+    """An overloaded runner fails every request in the batch without retrying."""
+    runner = RecordingRunner(error=InferenceOverloadedError("busy"))
+    batcher = PredictionBatcher(runner, max_batch_size=100, max_wait_seconds=0.01)
+
+    results = await predict_concurrently(batcher, REQUESTS)
+
+    assert all(isinstance(result, InferenceOverloadedError) for result in results)
+    assert len(runner.calls) == 1
+
+
+def test_overload_is_answered_with_503(monkeypatch):
+    """/api/predict maps InferenceOverloadedError to 503 with Retry-After."""
+
+    async def overloaded(transactions, cache_keys):
+        raise InferenceOverloadedError("Too many predictions in progress")
+
+    monkeypatch.setattr(main.predict_batcher, "predict", overloaded)
+    client = TestClient(main.app)
+
+    response = client.post(
+        "/api/predict", json={"transactions": [{"transaction_id": "T1", "amount": 10.0}]}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
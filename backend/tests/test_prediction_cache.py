@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-transaction prediction cache of the model service.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the backend directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.model_service import ModelService, model_loader
+from app.models import FraudAnalysis, FraudClassification
+
+
+def make_analysis(transaction_id: str) -> FraudAnalysis:
+    """Build the analysis the fake model returns for a transaction."""
+    classification = (
+        FraudClassification.UNKNOWN
+        if transaction_id.startswith("fail")
+        else FraudClassification.LEGITIMATE
+    )
+    return FraudAnalysis(
+        transaction_id=transaction_id,
+        classification=classification,
+        risk_score=0.1,
+        explanation="test",
+    )
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Model service whose predictions are faked and recorded per call."""
+    service = ModelService()
+    service.scored = []
+
+    def predict_transactions(transactions):
+        service.scored.append(list(transactions))
+        return [make_analysis(txn) for txn in transactions]
+
+    monkeypatch.setattr(service, "predict_transactions", predict_transactions)
+    return service
+
+
+@pytest.fixture
+def cache_size():
+    """Set prediction_cache_size for one test."""
+    original = settings.prediction_cache_size
+
+    def set_size(size: int) -> None:
+        object.__setattr__(settings, "prediction_cache_size", size)
+
+    yield set_size
+    object.__setattr__(settings, "prediction_cache_size", original)
+
+
+def predict(service, ids):
+    """Predict transactions keyed by their own ids."""
+    return service.predict_transactions_cached(list(ids), list(ids))
+
+
+def test_hits_skip_the_model_and_misses_share_one_batch(service, cache_size):
+    """Cached transactions are reused; only the misses are scored, together."""
+    cache_size(10)
+    first = predict(service, ["a", "b"])
+    second = predict(service, ["a", "c", "b"])
+
+    assert service.scored == [["a", "b"], ["c"]]
+    assert second[0] is first[0] and second[2] is first[1]
+    assert [a.transaction_id for a in second] == ["a", "c", "b"]
+
+
+def test_least_recently_used_entry_is_evicted(service, cache_size):
+    """A full cache drops the entry used least recently."""
+    cache_size(2)
+    predict(service, ["a", "b"])
+    predict(service, ["a"])  # "b" is now the oldest
+    predict(service, ["c"])
+    service.scored.clear()
+
+    predict(service, ["a", "b", "c"])
+
+    assert service.scored == [["b"]]
+
+
+def test_size_zero_disables_the_cache(service, cache_size):
+    """With size 0 every transaction is scored and nothing is stored."""
+    cache_size(0)
+    predict(service, ["a"])
+    predict(service, ["a"])
+
+    assert service.scored == [["a"], ["a"]]
+    assert not service._prediction_cache
+
+
+def test_unhashable_keys_bypass_the_cache(service, cache_size):
+    """Transactions with unhashable keys are scored every time."""
+    cache_size(10)
+    for _ in range(2):
+        service.predict_transactions_cached(["a", "b"], [["unhashable"], "b"])
+
+    assert service.scored == [["a", "b"], ["a"]]
+    assert list(service._prediction_cache) == ["b"]
+
+
+def test_unknown_analyses_are_not_stored(service, cache_size):
+    """Fallback UNKNOWN analyses from failures are not cached."""
+    cache_size(10)
+    predict(service, ["fail1", "a"])
+    predict(service, ["fail1", "a"])
+
+    assert service.scored == [["fail1", "a"], ["fail1"]]
+
+
+def test_initialize_clears_the_cache(service, cache_size, monkeypatch):
+    """Reloading the model artifacts drops cached analyses."""
+    cache_size(10)
+    predict(service, ["a"])
+    monkeypatch.setattr(model_loader, "load_model_artifacts", lambda: False)
+
+    service.initialize()
+    predict(service, ["a"])
+
+    assert service.scored == [["a"], ["a"]]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for reading back recent fraud analyses.
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+# Add the backend directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db_models import AnalyzedTransaction
+from app.db_service import get_recent_analyses
+
+CLASSIFICATIONS = ["legitimate", "fraudulent", "suspicious"]
+START = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+def make_analysis(i: int) -> AnalyzedTransaction:
+    """Build an analysis created i minutes after START."""
+    return AnalyzedTransaction(
+        transaction_id=f"TXN_{i:03d}",
+        timestamp=START,
+        merchant_name="Shop",
+        merchant_category="retail",
+        amount=Decimal("10.00"),
+        classification=CLASSIFICATIONS[i % 3],
+        risk_score=0.5,
+        risk_factors=["test"],
+        explanation="test",
+        model_version="test",
+        created_at=START + timedelta(minutes=i),
+    )
+
+
+@pytest_asyncio.fixture
+async def session():
+    """In-memory SQLite session with nine stored analyses."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(AnalyzedTransaction.__table__.create)
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        db.add_all([make_analysis(i) for i in range(9)])
+        await db.commit()
+        yield db
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_newest_analyses_come_first(session):
+    """Analyses are returned newest first, up to the limit."""
+    analyses = await get_recent_analyses(session, limit=4)
+
+    assert [a.transaction_id for a in analyses] == ["TXN_008", "TXN_007", "TXN_006", "TXN_005"]
+
+
+@pytest.mark.asyncio
+async def test_classification_filter(session):
+    """Only analyses of the requested classification are returned."""
+    analyses = await get_recent_analyses(session, classification_filter="fraudulent")
+
+    assert [a.transaction_id for a in analyses] == ["TXN_007", "TXN_004", "TXN_001"]
+    assert all(isinstance(a, AnalyzedTransaction) for a in analyses)
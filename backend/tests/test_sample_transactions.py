@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for sampling engineered transactions as plain column rows.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+# Add the backend directory to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import db_service
+from app.db_models import EngineeredTransaction
+from app.main import SAMPLE_RESPONSE_FIELDS, sample_rows_adapter
+from app.models import EngineeredTransactionResponse
+
+
+def make_transaction(i: int) -> EngineeredTransaction:
+    """Build an engineered transaction with distinct values per row."""
+    values = {
+        name: float(i) + 0.5
+        for name, field in EngineeredTransactionResponse.model_fields.items()
+        if field.annotation is float
+    }
+    return EngineeredTransaction(
+        **values,
+        trans_num=f"T{i:03d}",
+        is_fraud=i % 2,
+        cc_num=f"4000{i:04d}",
+        acct_num=1000 + i,
+        merchant=f"merchant_{i}",
+        category="travel",
+        lat=1.0,
+        long=2.0,
+        merch_lat=1.5,
+        merch_long=2.5,
+        hour_of_day=i % 24,
+        is_late_night_fraud_window=0,
+        is_late_evening_fraud_window=1,
+    )
+
+
+@pytest_asyncio.fixture
+async def session():
+    """In-memory SQLite session with a small engineered_transactions table."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(EngineeredTransaction.__table__.create)
+    async with AsyncSession(engine, expire_on_commit=False) as db:
+        db.add_all([make_transaction(i) for i in range(10)])
+        await db.commit()
+        db_service._scenario_row_counts.clear()
+        yield db
+    db_service._scenario_row_counts.clear()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_column_rows_validate_like_orm_instances(session):
+    """Core rows of the response columns build the same models as ORM instances."""
+    rows = await db_service.get_sample_transactions(
+        session, "mixed", 10, columns=SAMPLE_RESPONSE_FIELDS
+    )
+    assert len(rows) == 10
+    assert not isinstance(rows[0], EngineeredTransaction)
+
+    from_rows = sample_rows_adapter.validate_python(rows, from_attributes=True)
+    instances = await db_service.get_sample_transactions(session, "mixed", 10)
+    from_instances = [
+        EngineeredTransactionResponse.model_validate(t, from_attributes=True) for t in instances
+    ]
+
+    key = lambda t: t.trans_num  # noqa: E731
+    assert sorted(from_rows, key=key) == sorted(from_instances, key=key)
+
+
+@pytest.mark.asyncio
+async def test_column_rows_apply_scenario_filter(session):
+    """The scenario filter still applies when selecting columns."""
+    rows = await db_service.get_sample_transactions(
+        session, "fraud", 10, columns=SAMPLE_RESPONSE_FIELDS
+    )
+    assert len(rows) == 5
+    assert all(row.is_fraud == 1 for row in rows)
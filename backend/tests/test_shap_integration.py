@@ -8,6 +8,9 @@ import sys
 import logging
 from pathlib import Path
 
+import numpy as np
+import pytest
+
 # Add the backend directory to Python path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -258,6 +261,44 @@ def test_shap_feature_mapping():
         return False
 
 
+def test_batch_shap_matches_single():
+    """Test that batched SHAP explanations match the single-transaction ones."""
+    logger.info("=" * 60)
+    logger.info("Testing Batched SHAP Explanations")
+    logger.info("=" * 60)
+    
+    if not shap_explainer_service.is_initialized:
+        pytest.skip("SHAP explainer not initialized")
+    
+    from app.feature_engineering import feature_engineer
+    
+    X, _ = feature_engineer.process_transactions(load_sample_transactions())
+    
+    batch = shap_explainer_service.get_shap_explanations(X, top_n=4)
+    single = [
+        shap_explainer_service.get_shap_explanation(X.iloc[[i]], top_n=4)
+        for i in range(len(X))
+    ]
+    
+    logger.info(f"Compared SHAP explanations for {len(X)} transactions")
+    
+    assert len(batch) == len(single) == len(X)
+    for batch_features, single_features in zip(batch, single):
+        assert [f.feature_name for f in batch_features] == [
+            f.feature_name for f in single_features
+        ]
+        np.testing.assert_allclose(
+            [f.shap_value for f in batch_features],
+            [f.shap_value for f in single_features],
+            rtol=1e-6,
+        )
+        np.testing.assert_allclose(
+            [f.feature_value for f in batch_features],
+            [f.feature_value for f in single_features],
+        )
+        assert [f.severity for f in batch_features] == [f.severity for f in single_features]
+
+
 def main():
     """Run all SHAP integration tests."""
     logger.info("🚀 Starting SHAP Integration Tests")
@@ -274,6 +315,14 @@ def main():
     # Test 4: SHAP Feature Mapping
     test4_passed = test_shap_feature_mapping()
     
+    # Test 5: Batched SHAP explanations
+    try:
+        test_batch_shap_matches_single()
+        test5_passed = True
+    except (Exception, pytest.skip.Exception) as e:
+        logger.error(f"❌ Batched SHAP test failed: {str(e)}")
+        test5_passed = False
+    
     # Summary
     logger.info("=" * 60)
     logger.info("Test Summary")
@@ -282,8 +331,9 @@ def main():
     logger.info(f"SHAP Explainer Initialization: {'✅ PASS' if test2_passed else '❌ FAIL'}")
     logger.info(f"Fraud Prediction with SHAP: {'✅ PASS' if test3_passed else '❌ FAIL'}")
     logger.info(f"SHAP Feature Mapping: {'✅ PASS' if test4_passed else '❌ FAIL'}")
+    logger.info(f"Batched SHAP Explanations: {'✅ PASS' if test5_passed else '❌ FAIL'}")
     
-    all_passed = all([test1_passed, test2_passed, test3_passed, test4_passed])
+    all_passed = all([test1_passed, test2_passed, test3_passed, test4_passed, test5_passed])
     
     if all_passed:
         logger.info("\n🎉 All SHAP integration tests passed!")